@@ -1,8 +1,103 @@
 import os
-from typing import Dict, List, Optional
+import asyncio
+import threading
+import time
+from functools import cached_property, lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from web3 import Web3
 from solana.rpc.api import Client as SolanaClient
 import requests
+import httpx
+import orjson
+from cachetools import LRUCache, TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ERC-20 ABI for balanceOf/decimals/symbol
+ERC20_ABI = [
+    {
+        "constant": True,
+        "inputs": [{"name": "_owner", "type": "address"}],
+        "name": "balanceOf",
+        "outputs": [{"name": "balance", "type": "uint256"}],
+        "type": "function"
+    },
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "decimals",
+        "outputs": [{"name": "", "type": "uint8"}],
+        "type": "function"
+    },
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "symbol",
+        "outputs": [{"name": "", "type": "string"}],
+        "type": "function"
+    }
+]
+
+WEI_PER_ETHER = 10 ** 18
+
+# Native token symbol per EVM chain
+NATIVE_SYMBOLS = {
+    'ethereum': 'ETH',
+    'base': 'ETH',
+    'bsc': 'BNB',
+    'polygon': 'MATIC'
+}
+
+# Multicall3 is deployed at the same address on ethereum, base, bsc and polygon
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"}
+                ],
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"}
+                ],
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+# 4-byte function selectors used to build Multicall3 call data
+GET_ETH_BALANCE_SELECTOR = bytes.fromhex("4d2301cc")
+BALANCE_OF_SELECTOR = bytes.fromhex("70a08231")
+DECIMALS_SELECTOR = bytes.fromhex("313ce567")
+SYMBOL_SELECTOR = bytes.fromhex("95d89b41")
+
+# Some public RPC providers cap or serialize large JSON-RPC batches
+RPC_BATCH_SIZE = 10
+
+# Concurrent single-balance lookups on a chain are held this long and sent as one batch
+RPC_COALESCE_WINDOW = int(os.environ.get('RPC_COALESCE_WINDOW_MS', '5')) / 1000
+RPC_COALESCE_MAX = 20
+
+@lru_cache(maxsize=8192)
+def _checksum(address: str) -> str:
+    """Validate and checksum an address once, raising ValueError if invalid"""
+    return Web3.to_checksum_address(address)
 
 class BalanceChecker:
     def __init__(self):
@@ -14,55 +109,396 @@ class BalanceChecker:
             'polygon': os.environ.get('POLYGON_RPC', 'https://polygon-rpc.com'),
         }
         
-        # Initialize Web3 connections
-        self.web3_connections = {}
-        for chain, endpoint in self.rpc_endpoints.items():
-            try:
-                self.web3_connections[chain] = Web3(Web3.HTTPProvider(endpoint))
-            except Exception as e:
-                print(f"Failed to connect to {chain}: {e}")
+        # Share one pooled keep-alive session across all RPC providers; size the
+        # per-host pool above the handler thread count so warm connections are reused
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=int(os.environ.get('RPC_POOL_CONNECTIONS', '32')),
+            pool_maxsize=int(os.environ.get('RPC_POOL_MAXSIZE', '128')),
+            # JSON-RPC reads are sent as POST, so allow retrying them
+            max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[429, 502, 503, 504], allowed_methods=["POST"])
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update({"Connection": "keep-alive", "User-Agent": "eq-trading-bot"})
+        
+        # Web3 connections are created on first use per chain
+        self._providers = {}
+        self._provider_lock = threading.Lock()
+        
+        # ERC-20 contract objects per (chain, token_address), owned by this instance
+        self._token_contracts = LRUCache(maxsize=1024)
+        
+        # Token (decimals, symbol, 10 ** decimals) never change, keyed by (chain, token_address)
+        self._token_metadata = {}
+        
+        # Short-lived cache for balances, keyed by (chain, address) or (chain, address, token)
+        balance_ttl = int(os.environ.get('BALANCE_CACHE_TTL_MS', '5000')) / 1000
+        self._balance_cache = TTLCache(maxsize=50_000, ttl=balance_ttl)
+        self._cache_lock = threading.Lock()
+        self._inflight_locks = {}
+        
+        # Worker pool for issuing independent RPC calls concurrently
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="balance-rpc")
+        
+        # Disable for providers that bill or serialize JSON-RPC batches per call
+        self.batching_enabled = os.environ.get('RPC_BATCHING_ENABLED', 'true').lower() != 'false'
         
-        # Initialize Solana client
-        self.solana_client = SolanaClient(os.environ.get('SOLANA_RPC', 'https://api.mainnet-beta.solana.com'))
+        # Calls waiting for the next coalesced batch, keyed by chain
+        self._pending_calls = {}
+        self._pending_lock = threading.Lock()
+        
+        # Event-loop counterparts for get_eth_balance_async: in-flight lookups keyed like
+        # the balance cache, calls waiting for the next coalesced batch, and flush tasks
+        self._async_inflight = {}
+        self._async_pending = {}
+        self._async_flushes = set()
+    
+    def _w3(self, chain: str) -> Web3:
+        """Get the Web3 connection for a chain, creating it on first use"""
+        web3 = self._providers.get(chain)
+        if web3 is None:
+            with self._provider_lock:
+                if chain not in self._providers:
+                    provider = Web3.HTTPProvider(self.rpc_endpoints[chain], session=self._session, request_kwargs={'timeout': 10})
+                    # The session's urllib3 Retry already retries; web3's middleware would multiply it
+                    provider.middlewares = ()
+                    self._providers[chain] = Web3(provider)
+                web3 = self._providers[chain]
+        return web3
+    
+    def _token_contract(self, chain: str, token_address: str):
+        """Build the ERC-20 contract for a token once and reuse it"""
+        key = (chain, token_address)
+        with self._provider_lock:
+            contract = self._token_contracts.get(key)
+        if contract is None:
+            contract = self._w3(chain).eth.contract(address=token_address, abi=ERC20_ABI)
+            with self._provider_lock:
+                self._token_contracts[key] = contract
+        return contract
+    
+    @cached_property
+    def solana_client(self) -> SolanaClient:
+        """Solana client, created on first use"""
+        return SolanaClient(os.environ.get('SOLANA_RPC', 'https://api.mainnet-beta.solana.com'))
+    
+    @cached_property
+    def _async_client(self) -> httpx.AsyncClient:
+        """Pooled async HTTP client for awaitable RPC calls, created on first use"""
+        return httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=int(os.environ.get('RPC_ASYNC_MAX_CONNECTIONS', '200'))),
+            headers={"Content-Type": "application/json", "User-Agent": "eq-trading-bot"}
+        )
+    
+    def close(self):
+        """Close pooled RPC connections"""
+        self._executor.shutdown(wait=False)
+        self._session.close()
+    
+    async def aclose(self):
+        """Close the async HTTP client if it was used, then the pooled sync connections"""
+        client = self.__dict__.pop('_async_client', None)
+        if client is not None:
+            await client.aclose()
+        self.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _cached_balance(self, key: Tuple[str, ...], fetch) -> Dict:
+        """Return a cached balance, letting only one caller per key hit the RPC"""
+        with self._cache_lock:
+            if key in self._balance_cache:
+                return self._balance_cache[key]
+            inflight_lock = self._inflight_locks.setdefault(key, threading.Lock())
+        
+        with inflight_lock:
+            with self._cache_lock:
+                if key in self._balance_cache:
+                    return self._balance_cache[key]
+            
+            result = fetch()
+            
+            with self._cache_lock:
+                if result.get("success"):
+                    self._balance_cache[key] = result
+                self._inflight_locks.pop(key, None)
+            
+            return result
     
     def get_eth_balance(self, address: str, chain: str) -> Dict:
         """Get ETH/BNB/MATIC balance for EVM chains"""
+        # Validate address
         try:
-            if chain not in self.web3_connections:
+            address = _checksum(address)
+        except (ValueError, TypeError):
+            return {"success": False, "error": "Invalid address"}
+        
+        return self._cached_balance((chain, address), lambda: self._fetch_eth_balance(address, chain))
+    
+    async def get_eth_balance_async(self, address: str, chain: str) -> Dict:
+        """Get ETH/BNB/MATIC balance for EVM chains without tying up a thread"""
+        try:
+            address = _checksum(address)
+        except (ValueError, TypeError):
+            return {"success": False, "error": "Invalid address"}
+        
+        key = (chain, address)
+        with self._cache_lock:
+            cached = self._balance_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Concurrent lookups for the same key share one fetch
+        task = self._async_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_eth_balance_async(address, chain))
+            self._async_inflight[key] = task
+            task.add_done_callback(lambda _: self._async_inflight.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def _fetch_eth_balance_async(self, address: str, chain: str) -> Dict:
+        """Fetch ETH/BNB/MATIC balance over the async client and cache it"""
+        try:
+            if chain not in self.rpc_endpoints:
                 return {"success": False, "error": f"Unsupported chain: {chain}"}
             
-            web3 = self.web3_connections[chain]
+            balance_hex = None
+            if self.batching_enabled:
+                try:
+                    # Share one HTTP round trip with other users' lookups on this chain
+                    balance_hex = await self._coalesced_call_async(chain, "eth_getBalance", [address, "latest"])
+                except Exception:
+                    pass
             
-            # Validate address
-            if not web3.is_address(address):
-                return {"success": False, "error": "Invalid address"}
+            if balance_hex is None:
+                reply = await self._rpc_post_async(chain, {"jsonrpc": "2.0", "id": 0, "method": "eth_getBalance", "params": [address, "latest"]})
+                if "result" not in reply:
+                    return {"success": False, "error": str(reply.get("error", "No result in reply"))}
+                balance_hex = reply["result"]
+            
+            result = self._native_balance_result(int(balance_hex, 16), address, chain)
+            with self._cache_lock:
+                self._balance_cache[(chain, address)] = result
+            return result
+            
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def _rpc_post_async(self, chain: str, payload):
+        """POST a JSON-RPC request or batch to a chain's endpoint and decode the reply"""
+        response = await self._async_client.post(self.rpc_endpoints[chain], content=orjson.dumps(payload))
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    
+    async def _coalesced_call_async(self, chain: str, method: str, params: list):
+        """Queue a JSON-RPC call into the chain's next async batch and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        pending = self._async_pending.setdefault(chain, [])
+        pending.append((method, params, future))
+        if len(pending) >= RPC_COALESCE_MAX:
+            self._flush_pending_async(chain)
+        elif len(pending) == 1:
+            # First caller in this window schedules the flush
+            loop.call_later(RPC_COALESCE_WINDOW, self._flush_pending_async, chain)
+        
+        return await asyncio.wait_for(future, timeout=15)
+    
+    def _flush_pending_async(self, chain: str):
+        """Send whatever is queued for a chain's async batch"""
+        batch = self._async_pending.pop(chain, None)
+        if batch:
+            task = asyncio.ensure_future(self._send_coalesced_async(chain, batch))
+            self._async_flushes.add(task)
+            task.add_done_callback(self._async_flushes.discard)
+    
+    async def _send_coalesced_async(self, chain: str, batch: List[Tuple[str, list, asyncio.Future]]):
+        """Send queued calls as one batch and resolve each caller's future"""
+        try:
+            replies = await self._rpc_post_async(chain, [
+                {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+                for request_id, (method, params, _) in enumerate(batch)
+            ])
+            if not isinstance(replies, list):
+                raise ValueError("Endpoint does not support JSON-RPC batching")
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        # Replies may come back in any order
+        by_id = {reply.get("id"): reply for reply in replies}
+        for request_id, (_, _, future) in enumerate(batch):
+            if future.done():
+                continue
+            reply = by_id.get(request_id, {})
+            if "result" in reply:
+                future.set_result(reply["result"])
+            else:
+                future.set_exception(ValueError(reply.get("error", "No reply in batch")))
+    
+    def _fetch_eth_balance(self, address: str, chain: str) -> Dict:
+        """Fetch ETH/BNB/MATIC balance from the RPC endpoint"""
+        try:
+            if chain not in self.rpc_endpoints:
+                return {"success": False, "error": f"Unsupported chain: {chain}"}
+            
+            if self.batching_enabled:
+                try:
+                    # Share one HTTP round trip with other users' lookups on this chain
+                    balance_wei = int(self._coalesced_call(chain, "eth_getBalance", [address, "latest"]), 16)
+                    return self._native_balance_result(balance_wei, address, chain)
+                except Exception:
+                    pass
+            
+            web3 = self._w3(chain)
             
             # Get balance in wei
             balance_wei = web3.eth.get_balance(address)
-            balance_eth = web3.from_wei(balance_wei, 'ether')
-            
-            # Get symbol based on chain
-            symbols = {
-                'ethereum': 'ETH',
-                'base': 'ETH',
-                'bsc': 'BNB',
-                'polygon': 'MATIC'
-            }
             
-            return {
-                "success": True,
-                "balance_eth": float(balance_eth),
-                "balance_wei": str(balance_wei),
-                "symbol": symbols.get(chain, 'ETH'),
-                "chain": chain,
-                "address": address
-            }
+            return self._native_balance_result(balance_wei, address, chain)
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _native_balance_result(self, balance_wei: int, address: str, chain: str) -> Dict:
+        """Build the native balance response for EVM chains"""
+        return {
+            "success": True,
+            # Float division, not from_wei's Decimal: precision past ~15 digits is lost, fine for display
+            "balance_eth": balance_wei / WEI_PER_ETHER,
+            "balance_wei": str(balance_wei),
+            "symbol": NATIVE_SYMBOLS.get(chain, 'ETH'),
+            "chain": chain,
+            "address": address,
+            "fetched_at": time.time()
+        }
+    
+    def _rpc_batch(self, chain: str, calls: List[Tuple[str, list]]) -> List[Dict]:
+        """Send several JSON-RPC calls to a chain's endpoint in one HTTP POST"""
+        payload = [
+            {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+            for request_id, (method, params) in enumerate(calls)
+        ]
+        response = self._session.post(
+            self.rpc_endpoints[chain],
+            data=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=10
+        )
+        response.raise_for_status()
+        
+        replies = orjson.loads(response.content)
+        if not isinstance(replies, list):
+            raise ValueError("Endpoint does not support JSON-RPC batching")
+        
+        # Replies may come back in any order
+        by_id = {reply.get("id"): reply for reply in replies}
+        return [by_id.get(request_id, {}) for request_id in range(len(calls))]
+    
+    def _coalesced_call(self, chain: str, method: str, params: list):
+        """Queue a JSON-RPC call into the chain's next batch and wait for its result"""
+        future = Future()
+        flush_now = None
+        
+        with self._pending_lock:
+            pending = self._pending_calls.setdefault(chain, [])
+            pending.append((method, params, future))
+            if len(pending) >= RPC_COALESCE_MAX:
+                flush_now = self._pending_calls.pop(chain)
+            elif len(pending) == 1:
+                # First caller in this window schedules the flush
+                timer = threading.Timer(RPC_COALESCE_WINDOW, self._flush_pending, args=(chain,))
+                timer.name = f"rpc-coalesce-{chain}"
+                timer.daemon = True
+                timer.start()
+        
+        if flush_now:
+            self._send_coalesced(chain, flush_now)
+        
+        return future.result(timeout=15)
+    
+    def _flush_pending(self, chain: str):
+        """Send whatever is queued for a chain when its window closes"""
+        with self._pending_lock:
+            batch = self._pending_calls.pop(chain, None)
+        if batch:
+            self._send_coalesced(chain, batch)
+    
+    def _send_coalesced(self, chain: str, batch: List[Tuple[str, list, Future]]):
+        """Send queued calls as one batch and resolve each caller's future"""
+        try:
+            replies = self._rpc_batch(chain, [(method, params) for method, params, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        
+        for (_, _, future), reply in zip(batch, replies):
+            if "result" in reply:
+                future.set_result(reply["result"])
+            else:
+                future.set_exception(ValueError(reply.get("error", "No reply in batch")))
+    
+    def get_eth_balances_bulk(self, items: List[Tuple[str, str]]) -> List[Dict]:
+        """Get native balances for many (address, chain) pairs with one batched request per chain"""
+        results = [None] * len(items)
+        groups = {}
+        
+        for position, (address, chain) in enumerate(items):
+            if not self.batching_enabled or chain not in self.rpc_endpoints:
+                results[position] = self.get_eth_balance(address, chain)
+                continue
+            
+            try:
+                address = _checksum(address)
+            except (ValueError, TypeError):
+                results[position] = {"success": False, "error": "Invalid address"}
+                continue
+            
+            with self._cache_lock:
+                cached = self._balance_cache.get((chain, address))
+            if cached is not None:
+                results[position] = cached
+                continue
+            
+            groups.setdefault(chain, []).append((position, address))
+        
+        for chain, group in groups.items():
+            for start in range(0, len(group), RPC_BATCH_SIZE):
+                chunk = group[start:start + RPC_BATCH_SIZE]
+                try:
+                    replies = self._rpc_batch(chain, [("eth_getBalance", [address, "latest"]) for _, address in chunk])
+                except Exception:
+                    replies = [{}] * len(chunk)
+                
+                for (position, address), reply in zip(chunk, replies):
+                    if "result" not in reply:
+                        # Fall back to a single call for anything the batch did not answer
+                        results[position] = self.get_eth_balance(address, chain)
+                        continue
+                    
+                    result = self._native_balance_result(int(reply["result"], 16), address, chain)
+                    with self._cache_lock:
+                        self._balance_cache[(chain, address)] = result
+                    results[position] = result
+        
+        return results
+    
     def get_sol_balance(self, address: str) -> Dict:
         """Get SOL balance for Solana"""
+        return self._cached_balance(("solana", address), lambda: self._fetch_sol_balance(address))
+    
+    def _fetch_sol_balance(self, address: str) -> Dict:
+        """Fetch SOL balance from the RPC endpoint"""
         try:
             # Get SOL balance
             response = self.solana_client.get_balance(address)
@@ -77,7 +513,8 @@ class BalanceChecker:
                     "balance_lamports": balance_lamports,
                     "symbol": "SOL",
                     "chain": "solana",
-                    "address": address
+                    "address": address,
+                    "fetched_at": time.time()
                 }
             else:
                 return {"success": False, "error": "Failed to get Solana balance"}
@@ -87,62 +524,205 @@ class BalanceChecker:
     
     def get_token_balance(self, wallet_address: str, token_address: str, chain: str) -> Dict:
         """Get ERC-20 token balance"""
+        if chain not in self.rpc_endpoints:
+            return {"success": False, "error": f"Unsupported chain: {chain}"}
+        
+        # Validate addresses
         try:
-            if chain not in self.web3_connections:
-                return {"success": False, "error": f"Unsupported chain: {chain}"}
-            
-            web3 = self.web3_connections[chain]
-            
-            # ERC-20 ABI for balanceOf function
-            abi = [
-                {
-                    "constant": True,
-                    "inputs": [{"name": "_owner", "type": "address"}],
-                    "name": "balanceOf",
-                    "outputs": [{"name": "balance", "type": "uint256"}],
-                    "type": "function"
-                },
-                {
-                    "constant": True,
-                    "inputs": [],
-                    "name": "decimals",
-                    "outputs": [{"name": "", "type": "uint8"}],
-                    "type": "function"
-                },
-                {
-                    "constant": True,
-                    "inputs": [],
-                    "name": "symbol",
-                    "outputs": [{"name": "", "type": "string"}],
-                    "type": "function"
-                }
-            ]
+            wallet_address = _checksum(wallet_address)
+            token_address = _checksum(token_address)
+        except (ValueError, TypeError):
+            return {"success": False, "error": "Invalid address"}
+        
+        return self._cached_balance(
+            (chain, wallet_address, token_address),
+            lambda: self._fetch_token_balance(wallet_address, token_address, chain)
+        )
+    
+    def _fetch_token_balance(self, wallet_address: str, token_address: str, chain: str) -> Dict:
+        """Fetch ERC-20 token balance from the RPC endpoint"""
+        try:
+            # Reuse the contract instance for this token
+            contract = self._token_contract(chain, token_address)
             
-            # Create contract instance
-            contract = web3.eth.contract(address=token_address, abi=abi)
+            # Get balance, plus decimals and symbol concurrently the first time we see this token
+            balance_future = self._executor.submit(contract.functions.balanceOf(wallet_address).call)
+            metadata = self._token_metadata.get((chain, token_address))
+            if metadata is None:
+                decimals_future = self._executor.submit(contract.functions.decimals().call)
+                symbol_future = self._executor.submit(contract.functions.symbol().call)
+                decimals = decimals_future.result()
+                metadata = (decimals, symbol_future.result(), 10 ** decimals)
+                self._token_metadata[(chain, token_address)] = metadata
             
-            # Get balance
-            balance_raw = contract.functions.balanceOf(wallet_address).call()
-            decimals = contract.functions.decimals().call()
-            symbol = contract.functions.symbol().call()
+            return self._token_balance_result(balance_future.result(), metadata, token_address, chain)
             
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def _token_balance_result(self, balance_raw: int, metadata: Tuple[int, str, int], token_address: str, chain: str) -> Dict:
+        """Build the ERC-20 balance response"""
+        decimals, symbol, scale = metadata
+        
+        return {
+            "success": True,
             # Convert to human readable
-            balance = balance_raw / (10 ** decimals)
+            "balance": balance_raw / scale,
+            "balance_raw": str(balance_raw),
+            "symbol": symbol,
+            "decimals": decimals,
+            "token_address": token_address,
+            "chain": chain,
+            "fetched_at": time.time()
+        }
+    
+    def get_token_balances(self, wallet_address: str, token_addresses: List[str], chain: str) -> List[Dict]:
+        """Get several ERC-20 balances with one batched JSON-RPC request"""
+        if not self.batching_enabled or chain not in self.rpc_endpoints or len(token_addresses) < 2:
+            return [self.get_token_balance(wallet_address, token_address, chain) for token_address in token_addresses]
+        
+        try:
+            wallet = _checksum(wallet_address)
+        except (ValueError, TypeError):
+            return [{"success": False, "error": "Invalid address"} for _ in token_addresses]
+        
+        codec = self._w3(chain).codec
+        balance_of_data = "0x" + (BALANCE_OF_SELECTOR + codec.encode(["address"], [wallet])).hex()
+        results = [None] * len(token_addresses)
+        pending = []
+        
+        for position, token_address in enumerate(token_addresses):
+            try:
+                token = _checksum(token_address)
+            except (ValueError, TypeError):
+                results[position] = {"success": False, "error": "Invalid address"}
+                continue
             
-            return {
-                "success": True,
-                "balance": float(balance),
-                "balance_raw": str(balance_raw),
-                "symbol": symbol,
-                "decimals": decimals,
-                "token_address": token_address,
-                "chain": chain
-            }
+            with self._cache_lock:
+                cached = self._balance_cache.get((chain, wallet, token))
+            if cached is not None:
+                results[position] = cached
+            else:
+                pending.append((position, token))
+        
+        for start in range(0, len(pending), RPC_BATCH_SIZE):
+            chunk = pending[start:start + RPC_BATCH_SIZE]
             
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+            # balanceOf for every token, plus decimals/symbol for tokens we have not seen yet
+            calls = []
+            for _, token in chunk:
+                calls.append(("eth_call", [{"to": token, "data": balance_of_data}, "latest"]))
+                if (chain, token) not in self._token_metadata:
+                    calls.append(("eth_call", [{"to": token, "data": "0x" + DECIMALS_SELECTOR.hex()}, "latest"]))
+                    calls.append(("eth_call", [{"to": token, "data": "0x" + SYMBOL_SELECTOR.hex()}, "latest"]))
+            
+            try:
+                replies = self._rpc_batch(chain, calls)
+            except Exception:
+                replies = [{}] * len(calls)
+            
+            index = 0
+            for position, token in chunk:
+                balance_reply = replies[index]
+                index += 1
+                
+                if (chain, token) not in self._token_metadata:
+                    decimals_reply, symbol_reply = replies[index], replies[index + 1]
+                    index += 2
+                    try:
+                        decimals = codec.decode(["uint8"], bytes.fromhex(decimals_reply["result"][2:]))[0]
+                        symbol = codec.decode(["string"], bytes.fromhex(symbol_reply["result"][2:]))[0]
+                        self._token_metadata[(chain, token)] = (decimals, symbol, 10 ** decimals)
+                    except Exception:
+                        pass
+                
+                metadata = self._token_metadata.get((chain, token))
+                if "result" not in balance_reply or metadata is None:
+                    # Fall back to individual calls for anything the batch could not answer
+                    results[position] = self.get_token_balance(wallet, token, chain)
+                    continue
+                
+                result = self._token_balance_result(int(balance_reply["result"], 16), metadata, token, chain)
+                with self._cache_lock:
+                    self._balance_cache[(chain, wallet, token)] = result
+                results[position] = result
+        
+        return results
     
-    def get_all_balances(self, wallet_address: str, chain: str) -> Dict:
+    def _get_evm_balances(self, wallet_address: str, token_addresses: List[str], chain: str) -> Tuple[Dict, List[Dict]]:
+        """Get native and ERC-20 balances in a single Multicall3 aggregate3 eth_call"""
+        if chain not in self.rpc_endpoints:
+            return {"success": False, "error": f"Unsupported chain: {chain}"}, []
+        
+        web3 = self._w3(chain)
+        
+        # Validate address
+        try:
+            wallet = _checksum(wallet_address)
+        except (ValueError, TypeError):
+            return {"success": False, "error": "Invalid address"}, []
+        
+        encoded_wallet = web3.codec.encode(["address"], [wallet])
+        
+        # Native balance is read through Multicall3 itself
+        calls = [(MULTICALL3_ADDRESS, False, GET_ETH_BALANCE_SELECTOR + encoded_wallet)]
+        layout = []
+        tokens = []
+        
+        for token_address in token_addresses:
+            try:
+                token = _checksum(token_address)
+            except (ValueError, TypeError):
+                tokens.append({"success": False, "error": "Invalid token address", "token_address": token_address, "chain": chain})
+                continue
+            
+            calls.append((token, True, BALANCE_OF_SELECTOR + encoded_wallet))
+            
+            # Only ask for decimals/symbol the first time we see a token
+            needs_metadata = (chain, token) not in self._token_metadata
+            if needs_metadata:
+                calls.append((token, True, DECIMALS_SELECTOR))
+                calls.append((token, True, SYMBOL_SELECTOR))
+            
+            layout.append((len(tokens), token, needs_metadata))
+            tokens.append(None)
+        
+        multicall = web3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+        results = multicall.functions.aggregate3(calls).call()
+        
+        balance_wei = web3.codec.decode(["uint256"], results[0][1])[0]
+        native = self._native_balance_result(balance_wei, wallet_address, chain)
+        
+        index = 1
+        for position, token, needs_metadata in layout:
+            balance_ok, balance_data = results[index]
+            index += 1
+            
+            if needs_metadata:
+                (decimals_ok, decimals_data), (symbol_ok, symbol_data) = results[index], results[index + 1]
+                index += 2
+                try:
+                    if decimals_ok and symbol_ok:
+                        decimals = web3.codec.decode(["uint8"], decimals_data)[0]
+                        self._token_metadata[(chain, token)] = (
+                            decimals,
+                            web3.codec.decode(["string"], symbol_data)[0],
+                            10 ** decimals
+                        )
+                except Exception:
+                    pass
+            
+            metadata = self._token_metadata.get((chain, token))
+            if not balance_ok or metadata is None:
+                tokens[position] = {"success": False, "error": "Failed to read token balance", "token_address": token, "chain": chain}
+                continue
+            
+            balance_raw = web3.codec.decode(["uint256"], balance_data)[0]
+            tokens[position] = self._token_balance_result(balance_raw, metadata, token, chain)
+        
+        return native, tokens
+    
+    def get_all_balances(self, wallet_address: str, chain: str, token_addresses: Optional[List[str]] = None) -> Dict:
         """Get all balances for a wallet (native + tokens)"""
         try:
             balances = {
@@ -156,10 +736,15 @@ class BalanceChecker:
             if chain == "solana":
                 balances["native"] = self.get_sol_balance(wallet_address)
             else:
-                balances["native"] = self.get_eth_balance(wallet_address, chain)
-            
-            # TODO: Add token balance fetching for popular tokens
-            # This would require maintaining a list of popular token addresses
+                try:
+                    balances["native"], balances["tokens"] = self._get_evm_balances(wallet_address, token_addresses or [], chain)
+                except Exception:
+                    # Multicall3 unavailable on this endpoint, fall back to one call per balance
+                    balances["native"] = self.get_eth_balance(wallet_address, chain)
+                    balances["tokens"] = [
+                        self.get_token_balance(wallet_address, token_address, chain)
+                        for token_address in token_addresses or []
+                    ]
             
             return {
                 "success": True,
@@ -172,10 +757,13 @@ class BalanceChecker:
     def estimate_gas(self, from_address: str, to_address: str, value: int, chain: str) -> Dict:
         """Estimate gas for a transaction"""
         try:
-            if chain not in self.web3_connections:
+            if chain not in self.rpc_endpoints:
                 return {"success": False, "error": f"Unsupported chain: {chain}"}
             
-            web3 = self.web3_connections[chain]
+            web3 = self._w3(chain)
+            
+            # Get gas price once and reuse it for the estimate and the cost
+            gas_price = web3.eth.gas_price
             
             # Build transaction
             transaction = {
@@ -183,12 +771,11 @@ class BalanceChecker:
                 'to': to_address,
                 'value': value,
                 'gas': 21000,  # Standard gas limit for ETH transfer
-                'gasPrice': web3.eth.gas_price
+                'gasPrice': gas_price
             }
             
             # Estimate gas
             estimated_gas = web3.eth.estimate_gas(transaction)
-            gas_price = web3.eth.gas_price
             total_cost = estimated_gas * gas_price
             
             return {
@@ -196,7 +783,7 @@ class BalanceChecker:
                 "estimated_gas": estimated_gas,
                 "gas_price": gas_price,
                 "total_cost_wei": total_cost,
-                "total_cost_eth": web3.from_wei(total_cost, 'ether')
+                "total_cost_eth": total_cost / WEI_PER_ETHER
             }
             
         except Exception as e:
@@ -1,15 +1,28 @@
 import os
 import asyncio
-import threading
-import http.server
-import socketserver
-import json
+import atexit
+import logging
+import queue
+import re
+import html
+import time
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import asynccontextmanager
 from urllib.parse import parse_qs
-from datetime import datetime
+from weakref import WeakValueDictionary
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from cachetools import TTLCache
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, Response
+from starlette.routing import Route
 
 try:
-    from telegram.ext import Application, CommandHandler, MessageHandler, filters
+    from telegram.ext import Application, BaseUpdateProcessor, CommandHandler, Defaults, MessageHandler, TypeHandler, filters
     from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+    from telegram.constants import ParseMode
 except ImportError as e:
     raise ImportError(
         "The 'python-telegram-bot' package is required. Install it with 'pip install python-telegram-bot'."
@@ -21,135 +34,452 @@ from transaction_manager import TransactionManager
 from eth_account import Account
 import secrets
 import asyncio
-from functools import wraps
+from functools import lru_cache, wraps
+
+# Handlers only enqueue records; a background listener thread does the stdout writes
+# The QueueHandler formats each record once (prepare() bakes it into record.msg),
+# so the listener's handler only writes the message through
+_log_queue = queue.SimpleQueue()
+_queue_handler = QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), handlers=[_queue_handler])
+_log_listener = QueueListener(_log_queue, _stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+logger = logging.getLogger(__name__)
 
 TELEGRAM_TOKEN = os.environ.get("TELEGRAM_TOKEN")
 
+# EVM chains wallets can be connected to or set as default
+CHAIN_ORDER = ('ethereum', 'base', 'bsc', 'polygon')
+SUPPORTED_CHAINS = frozenset(CHAIN_ORDER)
+SUPPORTED_CHAINS_STR = ', '.join(CHAIN_ORDER)
+
+# Chains accepted by commands that also work with Solana wallets (/balance, /send, ...)
+ALL_CHAINS = SUPPORTED_CHAINS | {'solana'}
+ALL_CHAINS_STR = ', '.join(CHAIN_ORDER + ('solana',))
+
+# Accepted spellings of each chain, mapped to its canonical name
+CHAIN_ALIASES = {
+    'ethereum': 'ethereum', 'eth': 'ethereum',
+    'base': 'base',
+    'bsc': 'bsc', 'bnb': 'bsc',
+    'polygon': 'polygon', 'matic': 'polygon',
+    'solana': 'solana', 'sol': 'solana'
+}
+
+# Display names for chains in replies ('bsc'.capitalize() would give 'Bsc')
+CHAIN_DISPLAY = {
+    'ethereum': 'Ethereum',
+    'base': 'Base',
+    'bsc': 'BSC',
+    'polygon': 'Polygon',
+    'solana': 'Solana'
+}
+
+# Exactly 40 hex digits; int(..., 16) would also let signs, spaces and "_" through
+EVM_ADDRESS_RE = re.compile(r"0[xX][0-9a-fA-F]{40}")
+
+# Worker threads for blocking Supabase/RPC calls made via asyncio.to_thread
+THREAD_POOL_SIZE = int(os.environ.get("THREAD_POOL_SIZE", 32))
+
+# Updates handled at once across all chats; each chat still gets its updates in order
+MAX_CONCURRENT_UPDATES = int(os.environ.get("MAX_CONCURRENT_UPDATES", 64))
+
+# Telegram updates are well under this; anything larger is rejected before reading
+MAX_WEBHOOK_BODY_SIZE = 256 * 1024
+
+# uvloop/httptools when installed (not available on Windows), asyncio/h11 otherwise
+UVICORN_LOOP = os.environ.get("UVICORN_LOOP", "auto")
+UVICORN_HTTP = os.environ.get("UVICORN_HTTP", "auto")
+
+# Webhook acknowledgement body, serialized once
+WEBHOOK_OK_BODY = orjson.dumps({"ok": True})
+
+# Public URL Telegram delivers updates to
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "https://eq-auto-trading-telegram-bot-1.onrender.com/webhook")
+
+# Parallel HTTPS connections Telegram may open to the webhook (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.environ.get("WEBHOOK_MAX_CONNECTIONS", 100))
+
+# Discard updates that queued up at Telegram while the service was down
+DROP_PENDING_UPDATES = os.environ.get("DROP_PENDING_UPDATES", "false").lower() == "true"
+
+# Optional secret Telegram echoes in X-Telegram-Bot-Api-Secret-Token on every webhook
+WEBHOOK_SECRET_TOKEN = os.environ.get("WEBHOOK_SECRET_TOKEN")
+
 # Global application variable
 application = None
 
+# Telegram IDs already known to exist in the database
+known_users = TTLCache(maxsize=100_000, ttl=3600)
+
+# Fire-and-forget tasks, referenced here so they are not garbage collected mid-flight
+background_tasks = set()
+
+# Background /start registrations still in flight, keyed by user_id, so /generate can wait on them
+pending_registrations = {}
+
+# /wallets listings keyed by user_id; dropped whenever the user's wallets change
+wallets_cache = TTLCache(maxsize=10_000, ttl=30)
+
+# User settings dicts keyed by user_id, so updates can merge without re-reading the user
+settings_cache = TTLCache(maxsize=10_000, ttl=300)
+
 # Initialize managers with error handling
 try:
     db_manager = SupabaseManager()
-    print("✅ Database manager initialized")
+    logger.info("✅ Database manager initialized")
 except Exception as e:
-    print(f"❌ Database manager failed: {e}")
+    logger.error("❌ Database manager failed: %s", e)
     db_manager = None
 
 try:
     balance_checker = BalanceChecker()
-    print("✅ Balance checker initialized")
+    logger.info("✅ Balance checker initialized")
 except Exception as e:
-    print(f"❌ Balance checker failed: {e}")
+    logger.error("❌ Balance checker failed: %s", e)
     balance_checker = None
 
 try:
     transaction_manager = TransactionManager()
-    print("✅ Transaction manager initialized")
+    logger.info("✅ Transaction manager initialized")
 except Exception as e:
-    print(f"❌ Transaction manager failed: {e}")
+    logger.error("❌ Transaction manager failed: %s", e)
     transaction_manager = None
 
-# Simple HTTP server for Render's port requirement with webhook support
-class WebhookHTTPRequestHandler(http.server.BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(b"Telegram Bot is running!")
-        else:
-            self.send_response(404)
-            self.end_headers()
+# Static reply texts and keyboards, built once at import
+WELCOME_TEXT = """
+🤖 **Welcome to EQ Trading Bot!**
+
+**Available Commands:**
+🔐 **Wallet Management:**
+• `/generate` - Auto-generate fresh wallets for all chains
+• `/connect <name> <private_key> <chain>` - Add existing wallet
+• `/wallets` - View your wallets
+• `/balance <wallet_name> <chain>` - Check balance
+• `/remove <wallet_name> <chain>` - Remove wallet
+
+💰 **Transaction Commands:**
+• `/deposit <wallet_name> <chain>` - Get deposit address
+• `/send <wallet_name> <chain> <to_address> <amount> [token_address]` - Send transaction
+• `/status <tx_hash> <chain>` - Check transaction status
+• `/gas <wallet_name> <chain> <to_address> <amount> [token_address]` - Estimate gas
+
+⚙️ **Settings:**
+• `/settings` - View your settings
+• `/setchain <chain>` - Set default chain
+• `/setslippage <percentage>` - Set max slippage
+
+📊 **Trading (Coming Soon):**
+• `/buy <token> <amount>` - Manual buy
+• `/sell <token> <amount>` - Manual sell
+• `/autostart <strategy>` - Start auto trading
+
+**Supported Chains:** Ethereum, Base, BSC, Polygon, Solana
+
+**Example:** `/connect mywallet 1234567890abcdef ethereum`
+"""
+
+START_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔐 Connect Wallet", callback_data="connect_wallet")],
+    [InlineKeyboardButton("📊 View Wallets", callback_data="view_wallets")],
+    [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
+    [InlineKeyboardButton("❓ Help", callback_data="help")]
+])
+
+HELP_TEXT = """
+❓ **EQ Trading Bot Help**
+
+**🔧 Basic Commands:**
+• `/start` - Welcome message
+• `/test` - Test if bot is working
+• `/help` - Show this help
+
+**🔐 Wallet Management:**
+• `/generate` - Auto-generate fresh wallets for all chains
+• `/connect <name> <private_key> <chain>` - Add existing wallet
+• `/wallets` - View your wallets  
+• `/balance <wallet_name> <chain>` - Check native balance
+• `/token <wallet_name> <chain> <token_address>` - Check token balance
+• `/remove <wallet_name> <chain>` - Remove wallet
+
+**💰 Transaction Commands:**
+• `/deposit <wallet_name> <chain>` - Get deposit address
+• `/send <wallet_name> <chain> <to_address> <amount> [token_address]` - Send transaction
+• `/status <tx_hash> <chain>` - Check transaction status
+• `/gas <wallet_name> <chain> <to_address> <amount> [token_address]` - Estimate gas
+
+**⚙️ Settings:**
+• `/settings` - View your settings
+• `/setchain <chain>` - Set default chain
+• `/setslippage <percentage>` - Set max slippage
+
+**📊 Trading (Coming Soon):**
+• `/buy <token> <amount>` - Manual buy
+• `/sell <token> <amount>` - Manual sell
+• `/autostart <strategy>` - Start auto trading
+
+**🔗 Supported Chains:**
+• Ethereum (ETH)
+• Base (ETH)
+• BSC (BNB)
+• Polygon (MATIC)
+• Solana (SOL)
+
+**💡 Tips:**
+• Keep your private keys secure
+• Start with small amounts for testing
+• Use testnet first if available
+• Real-time balance checking from blockchain
+• Always estimate gas before sending transactions
+"""
+
+def markdown_to_telegram_html(text: str) -> str:
+    """Convert the **bold** / `code` subset used in static replies to Telegram HTML"""
+    text = html.escape(text, quote=False)
+    text = re.sub(r"`([^`]+)`", r"<code>\1</code>", text)
+    return re.sub(r"\*\*(.+?)\*\*", r"<b>\1</b>", text)
+
+# Pre-rendered once; Telegram's HTML mode has no Markdown escaping pitfalls
+WELCOME_HTML = markdown_to_telegram_html(WELCOME_TEXT)
+HELP_HTML = markdown_to_telegram_html(HELP_TEXT)
+
+DB_UNAVAILABLE_TEXT = (
+    "❌ **Database service is temporarily unavailable.**\n\n"
+    "Please try again in a few moments."
+)
+
+GENERATING_WALLETS_TEXT = (
+    "🔄 **Generating fresh wallets for all chains...**\n\n"
+    "This will create new wallets for:\n"
+    "• Ethereum (ETH)\n"
+    "• Base (ETH)\n"
+    "• BSC (BNB)\n"
+    "• Polygon (MATIC)\n\n"
+    "⏳ Please wait..."
+)
+
+GENERATE_FAILED_TEXT = (
+    "❌ **Failed to generate wallets.** Please try again later."
+)
+
+NO_WALLETS_TEXT = (
+    "📭 **No wallets found**\n\n"
+    "💡 **Get started:**\n"
+    "• `/generate` - Auto-create wallets for all chains\n"
+    "• `/connect <name> <private_key> <chain>` - Add existing wallet"
+)
+
+USAGE_CONNECT_TEXT = (
+    "❌ **Usage:** `/connect <wallet_name> <private_key> <chain>`\n\n"
+    "**Example:** `/connect mywallet 1234567890abcdef ethereum`\n\n"
+    "**Supported chains:** ethereum, base, bsc, polygon"
+)
+
+USAGE_BALANCE_TEXT = (
+    "❌ **Usage:** `/balance <wallet_name> <chain>`\n\n"
+    "**Example:** `/balance mywallet ethereum`"
+)
+
+USAGE_TOKEN_TEXT = (
+    "❌ **Usage:** `/token <wallet_name> <chain> <token_address>[,<token_address>...]`\n\n"
+    "**Example:** `/token mywallet ethereum 0xA0b86a33E6441b8c4C8C1C1C1C1C1C1C1C1C1C1C1`\n\n"
+    "**Supported chains:** ethereum, base, bsc, polygon"
+)
+
+USAGE_REMOVE_TEXT = (
+    "❌ **Usage:** `/remove <wallet_name> <chain>`\n\n"
+    "**Example:** `/remove mywallet ethereum`"
+)
+
+USAGE_SETCHAIN_TEXT = (
+    "❌ **Usage:** `/setchain <chain>`\n\n"
+    "**Supported chains:** ethereum, base, bsc, polygon"
+)
+
+USAGE_DEPOSIT_TEXT = (
+    "❌ **Usage:** `/deposit <wallet_name> <chain>`\n\n"
+    "**Example:** `/deposit mywallet ethereum`\n\n"
+    "**Supported chains:** ethereum, base, bsc, polygon, solana"
+)
+
+USAGE_SEND_TEXT = (
+    "❌ **Usage:** `/send <wallet_name> <chain> <to_address> <amount> [token_address]`\n\n"
+    "**Examples:**\n"
+    "• `/send mywallet ethereum 0x1234... 0.1` (native token)\n"
+    "• `/send mywallet ethereum 0x1234... 100 0xTokenAddress` (ERC-20 token)\n\n"
+    "**Supported chains:** ethereum, base, bsc, polygon"
+)
+
+USAGE_STATUS_TEXT = (
+    "❌ **Usage:** `/status <tx_hash> <chain>`\n\n"
+    "**Example:** `/status 0x1234... ethereum`\n\n"
+    "**Supported chains:** ethereum, base, bsc, polygon, solana"
+)
+
+USAGE_GAS_TEXT = (
+    "❌ **Usage:** `/gas <wallet_name> <chain> <to_address> <amount> [token_address]`\n\n"
+    "**Examples:**\n"
+    "• `/gas mywallet ethereum 0x1234... 0.1` (native token)\n"
+    "• `/gas mywallet ethereum 0x1234... 100 0xTokenAddress` (ERC-20 token)\n\n"
+    "**Supported chains:** ethereum, base, bsc, polygon"
+)
+
+# Reply templates, filled per call with str.format_map
+WALLET_CONNECTED_TMPL = (
+    "✅ **Wallet Connected Successfully!**\n\n"
+    "**Name:** {name}\n"
+    "**Address:** `{addr}`\n"
+    "**Chain:** {chain_cap}\n\n"
+    "Use `/balance {name} {chain}` to check balance"
+)
+
+BALANCE_TMPL = (
+    "💰 **Balance for {name}**\n\n"
+    "**Chain:** {chain_cap}\n"
+    "**Address:** `{addr}`\n"
+    "**Balance:** {bal:.6f} {sym}{cached}\n"
+    "**Raw:** {raw} wei"
+)
+
+WALLET_REMOVED_TMPL = (
+    "✅ **Wallet Removed Successfully!**\n\n"
+    "**Name:** {name}\n"
+    "**Chain:** {chain_cap}"
+)
+
+SETTINGS_TMPL = (
+    "⚙️ **Your Settings:**\n\n"
+    "**Default Chain:** {chain_cap}\n"
+    "**Max Slippage:** {slippage}%\n"
+    "**Notifications:** {notifications}\n\n"
+    "Use `/setchain <chain>` or `/setslippage <percentage>` to update"
+)
+
+DEFAULT_CHAIN_UPDATED_TMPL = "✅ **Default chain updated to:** {chain_cap}"
+
+TRANSACTION_SENT_TMPL = (
+    "✅ **Transaction Sent Successfully!**\n\n"
+    "**From:** {name}\n"
+    "**To:** `{to}`\n"
+    "**Amount:** {amount}\n"
+    "**Chain:** {chain_cap}\n"
+    "**Transaction Hash:** `{tx_hash}`\n"
+    "**Status:** {status}\n\n"
+    "Use `/status {tx_hash} {chain}` to check status"
+)
+
+# {extra} holds the optional block/confirmation/gas lines
+TX_STATUS_TMPL = (
+    "📊 **Transaction Status**\n\n"
+    "**Hash:** `{tx_hash}`\n"
+    "**Chain:** {chain_cap}\n"
+    "**Status:** {status}\n"
+    "{extra}"
+)
+
+GAS_ESTIMATE_TMPL = (
+    "⛽ **Gas Estimation**\n\n"
+    "**From:** {name}\n"
+    "**To:** `{to}`\n"
+    "**Amount:** {amount}\n"
+    "**Chain:** {chain_cap}\n"
+    "**Type:** {tx_type}\n\n"
+    "**Estimated Gas:** {gas}\n"
+    "**Gas Price:** {gas_price} wei\n"
+    "**Total Cost:** {cost:.6f} {sym}\n"
+    "**Total Cost (Wei):** {cost_wei}"
+)
+
+ERROR_TMPL = "❌ **Error:** {error}"
+
+INVALID_AMOUNT_TEXT = "❌ **Invalid amount.** Use a positive number, e.g. `0.1`"
+
+INVALID_ADDRESS_TEXT = "❌ **Invalid address.** EVM addresses are `0x` followed by 40 hex characters"
+
+INVALID_PRIVATE_KEY_TEXT = "❌ **Invalid private key.**"
+
+UNSUPPORTED_CHAIN_TMPL = (
+    "❌ **Unsupported chain:** {chain}\n\n"
+    "**Supported chains:** {supported}"
+)
+
+# ASGI app serving Render's port requirement and the Telegram webhook
+async def health(request):
+    return HTMLResponse("Telegram Bot is running!")
+
+async def webhook(request):
+    # Reject forged, non-JSON and oversized POSTs before touching the body
+    if WEBHOOK_SECRET_TOKEN and not secrets.compare_digest(
+        request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), WEBHOOK_SECRET_TOKEN
+    ):
+        return Response(status_code=403)
     
-    def do_POST(self):
-        if self.path == '/webhook':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            try:
-                update_data = json.loads(post_data.decode('utf-8'))
-                
-                # Process update in a new thread with proper event loop
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(self.process_update_sync, update_data)
-                    try:
-                        future.result(timeout=30)  # 30 second timeout
-                    except concurrent.futures.TimeoutError:
-                        print("Webhook processing timed out")
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(b'{"ok": true}')
-            except Exception as e:
-                print(f"Error processing webhook: {e}")
-                self.send_response(500)
-                self.end_headers()
-        else:
-            self.send_response(404)
-            self.end_headers()
-    
-    def process_update_sync(self, update_data):
-        """Process update in a synchronous context with new event loop"""
-        try:
-            # Create a new event loop for this thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            async def process():
-                global application
-                if application:
-                    update = Update.de_json(update_data, application.bot)
-                    await application.process_update(update)
-            
-            loop.run_until_complete(process())
-            loop.close()
-        except Exception as e:
-            print(f"Error in process_update_sync: {e}")
+    if not request.headers.get("Content-Type", "").startswith("application/json"):
+        return Response(status_code=415)
+    
+    try:
+        content_length = int(request.headers.get("Content-Length") or 0)
+    except ValueError:
+        content_length = 0
+    if content_length <= 0 or content_length > MAX_WEBHOOK_BODY_SIZE:
+        return Response(status_code=413)
+    
+    try:
+        update_data = orjson.loads(await request.body())
+        
+        # Acknowledge right away; the Application drains update_queue in the background
+        if application:
+            await application.update_queue.put(Update.de_json(update_data, application.bot))
+    except Exception as e:
+        logger.error("Error processing webhook: %s", e)
+        return Response(status_code=500)
+    
+    return Response(WEBHOOK_OK_BODY, media_type="application/json")
 
-def run_http_server():
-    port = int(os.environ.get('PORT', 10000))
-    with socketserver.TCPServer(("", port), WebhookHTTPRequestHandler) as httpd:
-        print(f"Starting HTTP server on port {port}")
-        httpd.serve_forever()
-
-def sync_db_operation(func):
-    """Decorator to handle database operations in sync context"""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        try:
-            # Try to run in current event loop
-            return func(*args, **kwargs)
-        except RuntimeError as e:
-            if "Event loop is closed" in str(e) or "no running event loop" in str(e):
-                # Create new event loop for this operation
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    result = func(*args, **kwargs)
-                    return result
-                finally:
-                    loop.close()
-            else:
-                raise e
-    return wrapper
+@asynccontextmanager
+async def lifespan(app):
+    """Start the bot on the server's event loop and stop it on shutdown"""
+    # asyncio.to_thread uses the default executor, which is only cpu_count + 4
+    # threads; size it for the blocking DB/RPC calls handlers run concurrently
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="blocking-io")
+    )
+    await setup_webhook()
+    yield
+    if application:
+        logger.info("Shutting down bot...")
+        await application.stop()
+        await application.shutdown()
+    if balance_checker:
+        await balance_checker.aclose()
+
+web_app = Starlette(
+    routes=[
+        Route("/", health, methods=["GET"]),
+        Route("/webhook", webhook, methods=["POST"]),
+    ],
+    lifespan=lifespan
+)
 
 def generate_wallet_for_chain(chain: str) -> dict:
     """Generate a new wallet for the specified chain"""
     try:
-        if chain.lower() in ['ethereum', 'base', 'bsc', 'polygon']:
-            # Generate EVM wallet
-            private_key = secrets.token_hex(32)
-            account = Account.from_key(private_key)
+        chain = chain.lower()
+        if chain in SUPPORTED_CHAINS:
+            # Generate EVM wallet from a single entropy draw, no hex round trip
+            account = Account.create()
             return {
                 "success": True,
-                "private_key": private_key,
+                "private_key": account.key.hex(),
                 "address": account.address,
-                "chain": chain.lower()
+                "chain": chain
             }
-        elif chain.lower() == 'solana':
+        elif chain == 'solana':
             # For now, return placeholder for Solana (would need solana-py keypair generation)
             return {
                 "success": False,
@@ -166,797 +496,794 @@ def generate_wallet_for_chain(chain: str) -> dict:
             "error": str(e)
         }
 
-async def auto_generate_wallets(user_id: str) -> dict:
+def generate_and_store_wallet(user_id: int, chain: str) -> dict:
+    """Generate a wallet for one chain and save it, returning its /generate result entry"""
+    wallet_gen = generate_wallet_for_chain(chain)
+    if not wallet_gen["success"]:
+        return {"chain": chain, "status": "failed", "error": wallet_gen["error"]}
+    
+    # Add wallet to database
+    wallet_result = db_manager.add_wallet(
+        telegram_id=user_id,
+        name=f"auto_{chain}",
+        address=wallet_gen["address"],
+        private_key=wallet_gen["private_key"],
+        chain=chain
+    )
+    
+    if wallet_result["success"]:
+        return {"chain": chain, "address": wallet_gen["address"], "status": "created"}
+    return {"chain": chain, "status": "failed", "error": wallet_result["error"]}
+
+async def auto_generate_wallets(user_id: int) -> dict:
     """Auto-generate wallets for all supported chains"""
-    chains = ['ethereum', 'base', 'bsc', 'polygon']
-    results = []
-    
-    for chain in chains:
-        wallet_gen = generate_wallet_for_chain(chain)
-        if wallet_gen["success"]:
-            # Add wallet to database
-            wallet_result = db_manager.add_wallet(
-                telegram_id=user_id,
-                name=f"auto_{chain}",
-                address=wallet_gen["address"],
-                private_key=wallet_gen["private_key"],
-                chain=chain
-            )
-            
-            if wallet_result["success"]:
-                results.append({
-                    "chain": chain,
-                    "address": wallet_gen["address"],
-                    "status": "created"
-                })
-            else:
-                results.append({
-                    "chain": chain,
-                    "status": "failed",
-                    "error": wallet_result["error"]
-                })
-        else:
-            results.append({
-                "chain": chain,
-                "status": "failed", 
-                "error": wallet_gen["error"]
-            })
+    chains = CHAIN_ORDER
     
+    # Key generation and inserts for each chain run side by side in worker threads
+    outcomes = await asyncio.gather(
+        *(asyncio.to_thread(generate_and_store_wallet, user_id, chain) for chain in chains),
+        return_exceptions=True
+    )
+    results = [
+        {"chain": chain, "status": "failed", "error": str(outcome)} if isinstance(outcome, Exception) else outcome
+        for chain, outcome in zip(chains, outcomes)
+    ]
+    
+    wallets_cache.pop(user_id, None)
     return {"success": True, "wallets": results}
 
-# Bot command handlers
-async def start(update, context):
-    """Welcome message with wallet management options"""
-    user_id = str(update.effective_user.id)
-    
-    try:
-        # Create or get user in database
-        user = update.effective_user
-        user_result = db_manager.get_user(user_id)
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Run updates from different chats concurrently, serializing updates within a chat"""
+    
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # Locks disappear once no update for that chat is pending
+        self._chat_locks = WeakValueDictionary()
+    
+    async def process_update(self, update, coroutine):
+        # Take the chat's lock before a concurrency slot: the base class grabs its
+        # semaphore first, so updates queued behind one busy chat would hold every slot
+        chat = getattr(update, "effective_chat", None)
+        if chat is None:
+            await super().process_update(update, coroutine)
+            return
         
-        if not user_result["success"]:
-            # Create new user
-            create_result = db_manager.create_user(
-                telegram_id=user_id,
-                username=user.username,
-                first_name=user.first_name,
-                last_name=user.last_name
-            )
-            if not create_result["success"]:
-                # Database error - show welcome anyway
-                print(f"Database error: {create_result['error']}")
-                # Continue with welcome message
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        # Continue with welcome message even if database fails
+        lock = self._chat_locks.get(chat.id)
+        if lock is None:
+            lock = self._chat_locks[chat.id] = asyncio.Lock()
+        async with lock:
+            await super().process_update(update, coroutine)
     
-    welcome_text = """
-🤖 **Welcome to EQ Trading Bot!**
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+    
+    async def initialize(self):
+        pass
+    
+    async def shutdown(self):
+        pass
 
-**Available Commands:**
-🔐 **Wallet Management:**
-• `/generate` - Auto-generate fresh wallets for all chains
-• `/connect <name> <private_key> <chain>` - Add existing wallet
-• `/wallets` - View your wallets
-• `/balance <wallet_name> <chain>` - Check balance
-• `/remove <wallet_name> <chain>` - Remove wallet
+def cached_tag(result: dict) -> str:
+    """Mark balances served from the short-lived balance cache"""
+    fetched_at = result.get("fetched_at")
+    return " (cached)" if fetched_at and time.time() - fetched_at > 1 else ""
 
-💰 **Transaction Commands:**
-• `/deposit <wallet_name> <chain>` - Get deposit address
-• `/send <wallet_name> <chain> <to_address> <amount> [token_address]` - Send transaction
-• `/status <tx_hash> <chain>` - Check transaction status
-• `/gas <wallet_name> <chain> <to_address> <amount> [token_address]` - Estimate gas
+async def fetch_wallet_balances(wallets: list) -> list:
+    """Fetch native balances for a wallet list concurrently, one batched RPC per EVM chain"""
+    balances = [None] * len(wallets)
+    if not balance_checker:
+        return balances
+    
+    evm = [(i, wallet) for i, wallet in enumerate(wallets) if wallet.get("address") and wallet["chain"] != "solana"]
+    sol = [(i, wallet) for i, wallet in enumerate(wallets) if wallet.get("address") and wallet["chain"] == "solana"]
+    
+    results = await asyncio.gather(
+        asyncio.to_thread(balance_checker.get_eth_balances_bulk, [(wallet["address"], wallet["chain"]) for _, wallet in evm]),
+        *(asyncio.to_thread(balance_checker.get_sol_balance, wallet["address"]) for _, wallet in sol),
+        return_exceptions=True
+    )
+    
+    # A failed lookup just leaves that wallet's balance out of the listing
+    evm_results = results[0] if isinstance(results[0], list) else [None] * len(evm)
+    for (i, _), result in zip(evm, evm_results):
+        balances[i] = result
+    for (i, _), result in zip(sol, results[1:]):
+        balances[i] = None if isinstance(result, BaseException) else result
+    
+    return balances
 
-⚙️ **Settings:**
-• `/settings` - View your settings
-• `/setchain <chain>` - Set default chain
-• `/setslippage <percentage>` - Set max slippage
+def parse_amount(text: str):
+    """Parse a positive amount, returning None for anything else"""
+    if not text or not (text[0].isdigit() or text[0] == "."):
+        return None
+    try:
+        amount = float(text)
+    except ValueError:
+        return None
+    return amount if 0 < amount < float("inf") else None
 
-📊 **Trading (Coming Soon):**
-• `/buy <token> <amount>` - Manual buy
-• `/sell <token> <amount>` - Manual sell
-• `/autostart <strategy>` - Start auto trading
+def is_evm_address(address: str) -> bool:
+    """Cheap shape check for a 0x-prefixed 20-byte hex address"""
+    return EVM_ADDRESS_RE.fullmatch(address) is not None
 
-**Supported Chains:** Ethereum, Base, BSC, Polygon, Solana
+async def reply_html(update, text: str):
+    """Send a reply carrying error text as HTML, so stray Markdown characters in it can't break parsing"""
+    await update.message.reply_text(markdown_to_telegram_html(text), parse_mode=ParseMode.HTML)
 
-**Example:** `/connect mywallet 1234567890abcdef ethereum`
-    """
+async def lookup_wallet_address(update, user_id: int, wallet_name: str, chain: str):
+    """Return a wallet's address, replying with the error and returning None if it can't be found"""
+    # get_wallet is served from the manager's wallet cache, which remove_wallet invalidates
+    wallet_result = await asyncio.to_thread(db_manager.get_wallet, user_id, wallet_name, chain)
     
-    keyboard = [
-        [InlineKeyboardButton("🔐 Connect Wallet", callback_data="connect_wallet")],
-        [InlineKeyboardButton("📊 View Wallets", callback_data="view_wallets")],
-        [InlineKeyboardButton("⚙️ Settings", callback_data="settings")],
-        [InlineKeyboardButton("❓ Help", callback_data="help")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    if not wallet_result["success"]:
+        await reply_html(update, ERROR_TMPL.format_map(wallet_result))
+        return None
+    
+    return wallet_result["wallet"]["address"]
+
+def normalize_chain(name: str):
+    """Return the canonical chain name for a user-typed chain, or None if unknown"""
+    return CHAIN_ALIASES.get(name.lower())
+
+def command_args(min_args: int, usage: str, chain_arg: int = None, chains: frozenset = SUPPORTED_CHAINS):
+    """Reply with the usage text unless the command has enough args and, if checked, a supported chain"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(update, context):
+            args = context.args
+            if not args or len(args) < min_args:
+                await update.message.reply_text(usage)
+                return
+            
+            if chain_arg is not None:
+                if normalize_chain(args[chain_arg]) not in chains:
+                    supported = SUPPORTED_CHAINS_STR if chains is SUPPORTED_CHAINS else ALL_CHAINS_STR
+                    await update.message.reply_text(
+                        UNSUPPORTED_CHAIN_TMPL.format_map({"chain": args[chain_arg], "supported": supported})
+                    )
+                    return
+            
+            return await func(update, context)
+        return wrapper
+    return decorator
+
+async def register_user(user_id: int, username: str, first_name: str, last_name: str):
+    """Create the user row if it does not exist yet, marking the user known once it does"""
+    try:
+        result = await asyncio.to_thread(db_manager.upsert_user, user_id, username, first_name, last_name)
+        if result["success"]:
+            known_users[user_id] = True
+        else:
+            # Database error - retry on the next /start
+            logger.warning("Database error: %s", result['error'])
+    except Exception as e:
+        logger.warning("Database connection error: %s", e)
+    finally:
+        pending_registrations.pop(user_id, None)
+
+# Bot command handlers
+async def attach_user_id(update, context):
+    """Store the sender's Telegram ID in user_data, once per user; it stays an int until the DB layer"""
+    if update.effective_user and "uid" not in context.user_data:
+        context.user_data["uid"] = update.effective_user.id
+
+async def start(update, context):
+    """Welcome message with wallet management options"""
+    user_id = context.user_data["uid"]
     
-    await update.message.reply_text(welcome_text, reply_markup=reply_markup, parse_mode='Markdown')
+    # Returning users skip the database entirely; new ones are registered in the
+    # background so the welcome goes out without waiting on Supabase
+    if user_id not in known_users and user_id not in pending_registrations and db_manager:
+        user = update.effective_user
+        task = asyncio.create_task(register_user(user_id, user.username, user.first_name, user.last_name))
+        pending_registrations[user_id] = task
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+    
+    await update.message.reply_text(WELCOME_HTML, reply_markup=START_KEYBOARD, parse_mode=ParseMode.HTML)
 
 async def generate_wallets_command(update, context):
     """Generate fresh wallets for all supported chains"""
-    user_id = str(update.effective_user.id)
+    user_id = context.user_data["uid"]
     
     if not db_manager:
-        await update.message.reply_text(
-            "❌ **Database service is temporarily unavailable.**\n\n"
-            "Please try again in a few moments.",
-            parse_mode='Markdown'
-        )
+        await update.message.reply_text(DB_UNAVAILABLE_TEXT)
         return
     
     try:
-        # Check if user exists, create if not
-        user_result = db_manager.get_user(user_id)
-        if not user_result["success"]:
+        # Let a registration started by /start finish before checking the user row
+        pending = pending_registrations.get(user_id)
+        if pending is not None:
+            await asyncio.shield(pending)
+        
+        # Make sure the user row exists; known users skip the round trip
+        if user_id not in known_users:
             user = update.effective_user
-            create_result = db_manager.create_user(
+            create_result = await asyncio.to_thread(
+                db_manager.upsert_user,
                 telegram_id=user_id, username=user.username, 
                 first_name=user.first_name, last_name=user.last_name
             )
             if not create_result["success"]:
-                await update.message.reply_text(
-                    f"❌ **Error creating user account:** {create_result['error']}",
-                    parse_mode='Markdown'
+                await reply_html(
+                    update,
+                    f"❌ **Error creating user account:** {create_result['error']}"
                 )
                 return
+            known_users[user_id] = True
         
-        await update.message.reply_text(
-            "🔄 **Generating fresh wallets for all chains...**\n\n"
-            "This will create new wallets for:\n"
-            "• Ethereum (ETH)\n"
-            "• Base (ETH)\n" 
-            "• BSC (BNB)\n"
-            "• Polygon (MATIC)\n\n"
-            "⏳ Please wait...",
-            parse_mode='Markdown'
-        )
+        await update.message.reply_text(GENERATING_WALLETS_TEXT)
         
         # Generate wallets
         result = await auto_generate_wallets(user_id)
         
         if result["success"]:
-            wallet_text = "✅ **Wallets Generated Successfully!**\n\n"
+            parts = ["✅ **Wallets Generated Successfully!**\n\n"]
             
             for wallet in result["wallets"]:
                 if wallet["status"] == "created":
-                    wallet_text += f"🔗 **{wallet['chain'].upper()}**\n"
-                    wallet_text += f"Address: `{wallet['address']}`\n\n"
+                    parts.append(f"🔗 **{wallet['chain'].upper()}**\n")
+                    parts.append(f"Address: `{wallet['address']}`\n\n")
                 else:
-                    wallet_text += f"❌ **{wallet['chain'].upper()}:** {wallet['error']}\n\n"
+                    parts.append(f"❌ **{wallet['chain'].upper()}:** {wallet['error']}\n\n")
             
-            wallet_text += "💡 **Important:**\n"
-            wallet_text += "• These are fresh wallets with 0 balance\n"
-            wallet_text += "• Send funds to these addresses to start trading\n"
-            wallet_text += "• Use `/balance auto_<chain> <chain>` to check balances\n"
-            wallet_text += "• Use `/deposit auto_<chain> <chain>` for deposit info"
+            parts.append("💡 **Important:**\n")
+            parts.append("• These are fresh wallets with 0 balance\n")
+            parts.append("• Send funds to these addresses to start trading\n")
+            parts.append("• Use `/balance auto_<chain> <chain>` to check balances\n")
+            parts.append("• Use `/deposit auto_<chain> <chain>` for deposit info")
             
-            await update.message.reply_text(wallet_text, parse_mode='Markdown')
+            # Per-chain failures carry raw error text
+            await reply_html(update, "".join(parts))
         else:
-            await update.message.reply_text(
-                "❌ **Failed to generate wallets.** Please try again later.",
-                parse_mode='Markdown'
-            )
+            await update.message.reply_text(GENERATE_FAILED_TEXT)
             
     except Exception as e:
-        await update.message.reply_text(
+        await reply_html(
+            update,
             f"❌ **Error:** Unable to generate wallets.\n\n"
-            f"**Error:** {str(e)}",
-            parse_mode='Markdown'
+            f"**Error:** {str(e)}"
         )
 
+@command_args(3, USAGE_CONNECT_TEXT, chain_arg=2)
 async def connect_wallet(update, context):
     """Connect a new wallet"""
-    user_id = str(update.effective_user.id)
-    
-    if not context.args or len(context.args) < 3:
-        await update.message.reply_text(
-            "❌ **Usage:** `/connect <wallet_name> <private_key> <chain>`\n\n"
-            "**Example:** `/connect mywallet 1234567890abcdef ethereum`\n\n"
-            "**Supported chains:** ethereum, base, bsc, polygon",
-            parse_mode='Markdown'
-        )
-        return
+    user_id = context.user_data["uid"]
     
     wallet_name = context.args[0]
     private_key = context.args[1]
-    chain = context.args[2].lower()
+    chain = normalize_chain(context.args[2])
     
-    # Validate chain
-    supported_chains = ['ethereum', 'base', 'bsc', 'polygon']
-    if chain not in supported_chains:
-        await update.message.reply_text(
-            f"❌ **Unsupported chain:** {chain}\n\n"
-            f"**Supported chains:** {', '.join(supported_chains)}",
-            parse_mode='Markdown'
-        )
+    # Reject malformed keys before touching the database
+    try:
+        address = Account.from_key(private_key).address
+    except Exception:
+        # eth_keys raises its own ValidationError for wrong-length keys
+        await update.message.reply_text(INVALID_PRIVATE_KEY_TEXT)
         return
     
     try:
         # Add wallet to database
-        result = db_manager.add_wallet(user_id, wallet_name, private_key, chain)
+        result = await asyncio.to_thread(
+            db_manager.add_wallet,
+            telegram_id=user_id,
+            name=wallet_name,
+            address=address,
+            private_key=private_key,
+            chain=chain
+        )
         
         if result["success"]:
+            wallets_cache.pop(user_id, None)
             await update.message.reply_text(
-                f"✅ **Wallet Connected Successfully!**\n\n"
-                f"**Name:** {wallet_name}\n"
-                f"**Address:** `{result['wallet_address']}`\n"
-                f"**Chain:** {chain.capitalize()}\n\n"
-                f"Use `/balance {wallet_name} {chain}` to check balance",
-                parse_mode='Markdown'
+                WALLET_CONNECTED_TMPL.format_map({
+                    "name": wallet_name,
+                    "addr": result['wallet_address'],
+                    "chain": chain,
+                    "chain_cap": CHAIN_DISPLAY.get(chain, chain)
+                })
             )
         else:
-            await update.message.reply_text(
+            await reply_html(
+                update,
                 f"❌ **Failed to connect wallet:** {result['error']}\n\n"
-                f"**Note:** Database connection issue. Please try again later.",
-                parse_mode='Markdown'
+                f"**Note:** Database connection issue. Please try again later."
             )
     except Exception as e:
-        await update.message.reply_text(
+        await reply_html(
+            update,
             f"❌ **Database Error:** Unable to connect wallet at this time.\n\n"
             f"**Error:** {str(e)}\n\n"
-            f"Please try again later or contact support.",
-            parse_mode='Markdown'
+            f"Please try again later or contact support."
         )
 
 async def list_wallets(update, context):
     """List user's wallets"""
-    user_id = str(update.effective_user.id)
+    user_id = context.user_data["uid"]
     
     if not db_manager:
-        await update.message.reply_text(
-            "❌ **Database service is temporarily unavailable.**\n\n"
-            "Please try again in a few moments.",
-            parse_mode='Markdown'
-        )
+        await update.message.reply_text(DB_UNAVAILABLE_TEXT)
         return
     
     try:
-        result = db_manager.get_user_wallets(user_id)
-        
-        if not result["success"]:
-            await update.message.reply_text(
-                f"❌ **Database Error:** {result['error']}\n\n"
-                f"Please try again later.",
-                parse_mode='Markdown'
-            )
-            return
+        # Repeated /wallets presses within the TTL are served from memory
+        wallets = wallets_cache.get(user_id)
         
-        wallets = result["wallets"]
+        if wallets is None:
+            result = await asyncio.to_thread(db_manager.get_user_wallets, user_id)
+            
+            if not result["success"]:
+                await reply_html(
+                    update,
+                    f"❌ **Database Error:** {result['error']}\n\n"
+                    f"Please try again later."
+                )
+                return
+            
+            wallets = result["wallets"]
+            wallets_cache[user_id] = wallets
         
         if not wallets:
-            await update.message.reply_text(
-                "📭 **No wallets found**\n\n"
-                "💡 **Get started:**\n"
-                "• `/generate` - Auto-create wallets for all chains\n"
-                "• `/connect <name> <private_key> <chain>` - Add existing wallet",
-                parse_mode='Markdown'
-            )
+            await update.message.reply_text(NO_WALLETS_TEXT)
             return
         
-        wallet_text = "🔐 **Your Wallets:**\n\n"
-        for i, wallet in enumerate(wallets, 1):
-            wallet_text += f"{i}. **{wallet['name']}** ({wallet['chain'].capitalize()})\n"
-            wallet_text += f"   Address: `{wallet['address']}`\n"
-            wallet_text += f"   Added: {wallet['created_at']}\n\n"
+        balances = await fetch_wallet_balances(wallets)
+        
+        parts = ["🔐 **Your Wallets:**\n\n"]
+        for i, (wallet, balance) in enumerate(zip(wallets, balances), 1):
+            parts.append(f"{i}. **{wallet['name']}** ({CHAIN_DISPLAY.get(wallet['chain'], wallet['chain'])})\n")
+            parts.append(f"   Address: `{wallet['address']}`\n")
+            if balance and balance.get("success"):
+                amount = balance.get("balance_eth", balance.get("balance_sol"))
+                parts.append(f"   Balance: {amount:.6f} {balance['symbol']}{cached_tag(balance)}\n")
+            parts.append(f"   Added: {wallet['created_at']}\n\n")
         
-        wallet_text += "💡 **Commands:**\n"
-        wallet_text += "• `/balance <wallet_name> <chain>` - Check balance\n"
-        wallet_text += "• `/deposit <wallet_name> <chain>` - Get deposit address"
+        parts.append("💡 **Commands:**\n")
+        parts.append("• `/balance <wallet_name> <chain>` - Check balance\n")
+        parts.append("• `/deposit <wallet_name> <chain>` - Get deposit address")
         
-        await update.message.reply_text(wallet_text, parse_mode='Markdown')
+        await update.message.reply_text("".join(parts))
         
     except Exception as e:
-        await update.message.reply_text(
+        await reply_html(
+            update,
             f"❌ **Database connection issue.**\n\n"
             f"**Technical details:** {str(e)}\n\n"
             f"**Solutions:**\n"
             f"• Wait 30 seconds and try again\n"
             f"• Try `/test` to check if bot is responding\n"
-            f"• Contact support if issue persists",
-            parse_mode='Markdown'
+            f"• Contact support if issue persists"
         )
 
-async def test_command(update, context):
-    """Simple test command to verify bot is working"""
-    await update.message.reply_text(
+@lru_cache(maxsize=1)
+def test_reply_text(second: int) -> str:
+    """Build the /test reply, reused for every call within the same second"""
+    return (
         "✅ **Bot is working!**\n\n"
         "**Status:** Online and responding\n"
-        "**Time:** " + datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC"),
-        parse_mode='Markdown'
+        f"**Time:** {time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(second))} UTC"
     )
 
+async def test_command(update, context):
+    """Simple test command to verify bot is working"""
+    await update.message.reply_text(test_reply_text(int(time.time())))
+
+@command_args(2, USAGE_BALANCE_TEXT, chain_arg=1, chains=ALL_CHAINS)
 async def check_balance(update, context):
     """Check wallet balance"""
-    user_id = str(update.effective_user.id)
-    
-    if not context.args or len(context.args) < 2:
-        await update.message.reply_text(
-            "❌ **Usage:** `/balance <wallet_name> <chain>`\n\n"
-            "**Example:** `/balance mywallet ethereum`",
-            parse_mode='Markdown'
-        )
-        return
+    user_id = context.user_data["uid"]
     
     wallet_name = context.args[0]
-    chain = context.args[1].lower()
-    
-    # Get wallet from database
-    wallet_result = db_manager.get_wallet(user_id, wallet_name, chain)
+    chain = normalize_chain(context.args[1])
     
-    if not wallet_result["success"]:
-        await update.message.reply_text(f"❌ **Error:** {wallet_result['error']}", parse_mode='Markdown')
+    address = await lookup_wallet_address(update, user_id, wallet_name, chain)
+    if address is None:
         return
     
-    wallet = wallet_result["wallet"]
-    
-    # Get real-time balance from blockchain
-    if chain.lower() == "solana":
-        balance_result = balance_checker.get_sol_balance(wallet["address"])
+    # Get real-time balance from blockchain without blocking the event loop
+    if chain == "solana":
+        balance_result = await asyncio.to_thread(balance_checker.get_sol_balance, address)
         if balance_result["success"]:
             result = {
                 "success": True,
-                "wallet_address": wallet["address"],
+                "wallet_address": address,
                 "balance_eth": balance_result["balance_sol"],
                 "balance_wei": str(balance_result["balance_lamports"]),
-                "symbol": "SOL"
+                "symbol": "SOL",
+                "fetched_at": balance_result["fetched_at"]
             }
         else:
             result = {"success": False, "error": balance_result["error"]}
     else:
-        balance_result = balance_checker.get_eth_balance(wallet["address"], chain.lower())
+        balance_result = await balance_checker.get_eth_balance_async(address, chain)
         if balance_result["success"]:
             result = {
                 "success": True,
-                "wallet_address": wallet["address"],
+                "wallet_address": address,
                 "balance_eth": balance_result["balance_eth"],
                 "balance_wei": balance_result["balance_wei"],
-                "symbol": balance_result["symbol"]
+                "symbol": balance_result["symbol"],
+                "fetched_at": balance_result["fetched_at"]
             }
         else:
             result = {"success": False, "error": balance_result["error"]}
     
     if result["success"]:
         await update.message.reply_text(
-            f"💰 **Balance for {wallet_name}**\n\n"
-            f"**Chain:** {chain.capitalize()}\n"
-            f"**Address:** `{result['wallet_address']}`\n"
-            f"**Balance:** {result['balance_eth']:.6f} {result['symbol']}\n"
-            f"**Raw:** {result['balance_wei']} wei",
-            parse_mode='Markdown'
+            BALANCE_TMPL.format_map({
+                "name": wallet_name,
+                "chain_cap": CHAIN_DISPLAY.get(chain, chain),
+                "addr": result['wallet_address'],
+                "bal": result['balance_eth'],
+                "sym": result['symbol'],
+                "cached": cached_tag(result),
+                "raw": result['balance_wei']
+            })
         )
     else:
-        await update.message.reply_text(
-            f"❌ **Failed to get balance:** {result['error']}",
-            parse_mode='Markdown'
+        await reply_html(
+            update,
+            f"❌ **Failed to get balance:** {result['error']}"
         )
 
+@command_args(2, USAGE_REMOVE_TEXT, chain_arg=1, chains=ALL_CHAINS)
 async def remove_wallet(update, context):
     """Remove a wallet"""
-    user_id = str(update.effective_user.id)
-    
-    if not context.args or len(context.args) < 2:
-        await update.message.reply_text(
-            "❌ **Usage:** `/remove <wallet_name> <chain>`\n\n"
-            "**Example:** `/remove mywallet ethereum`",
-            parse_mode='Markdown'
-        )
-        return
+    user_id = context.user_data["uid"]
     
     wallet_name = context.args[0]
-    chain = context.args[1].lower()
+    chain = normalize_chain(context.args[1])
     
-    result = db_manager.remove_wallet(user_id, wallet_name, chain)
+    result = await asyncio.to_thread(db_manager.remove_wallet, user_id, wallet_name, chain)
     
     if result["success"]:
+        wallets_cache.pop(user_id, None)
         await update.message.reply_text(
-            f"✅ **Wallet Removed Successfully!**\n\n"
-            f"**Name:** {wallet_name}\n"
-            f"**Chain:** {chain.capitalize()}",
-            parse_mode='Markdown'
+            WALLET_REMOVED_TMPL.format_map({"name": wallet_name, "chain_cap": CHAIN_DISPLAY.get(chain, chain)})
         )
     else:
-        await update.message.reply_text(
-            f"❌ **Failed to remove wallet:** {result['error']}",
-            parse_mode='Markdown'
+        await reply_html(
+            update,
+            f"❌ **Failed to remove wallet:** {result['error']}"
         )
 
 async def user_settings(update, context):
     """Show user settings"""
-    user_id = str(update.effective_user.id)
-    user_result = db_manager.get_user(user_id)
+    user_id = context.user_data["uid"]
+    user_result = await asyncio.to_thread(db_manager.get_user, user_id)
     
     if not user_result["success"]:
-        await update.message.reply_text(f"❌ **Error:** {user_result['error']}", parse_mode='Markdown')
+        await reply_html(update, ERROR_TMPL.format_map(user_result))
         return
     
     user = user_result["user"]
-    settings = user.get("settings", {})
+    settings = user.get("settings") or {}
+    settings_cache[user_id] = settings
+    default_chain = settings.get('default_chain', 'ethereum')
     
-    settings_text = "⚙️ **Your Settings:**\n\n"
-    settings_text += f"**Default Chain:** {settings.get('default_chain', 'ethereum').capitalize()}\n"
-    settings_text += f"**Max Slippage:** {settings.get('max_slippage', 5.0)}%\n"
-    settings_text += f"**Notifications:** {'✅' if settings.get('notifications', True) else '❌'}\n\n"
-    settings_text += "Use `/setchain <chain>` or `/setslippage <percentage>` to update"
+    settings_text = SETTINGS_TMPL.format_map({
+        "chain_cap": CHAIN_DISPLAY.get(default_chain, default_chain),
+        "slippage": settings.get('max_slippage', 5.0),
+        "notifications": '✅' if settings.get('notifications', True) else '❌'
+    })
     
-    await update.message.reply_text(settings_text, parse_mode='Markdown')
+    await update.message.reply_text(settings_text)
 
+@command_args(1, USAGE_SETCHAIN_TEXT, chain_arg=0)
 async def set_default_chain(update, context):
     """Set default chain"""
-    user_id = str(update.effective_user.id)
-    
-    if not context.args:
-        await update.message.reply_text(
-            "❌ **Usage:** `/setchain <chain>`\n\n"
-            "**Supported chains:** ethereum, base, bsc, polygon",
-            parse_mode='Markdown'
-        )
-        return
+    user_id = context.user_data["uid"]
     
-    chain = context.args[0].lower()
-    supported_chains = ['ethereum', 'base', 'bsc', 'polygon']
+    chain = normalize_chain(context.args[0])
     
-    if chain not in supported_chains:
-        await update.message.reply_text(
-            f"❌ **Unsupported chain:** {chain}\n\n"
-            f"**Supported chains:** {', '.join(supported_chains)}",
-            parse_mode='Markdown'
-        )
-        return
-    
-    # Get current user settings
-    user_result = db_manager.get_user(user_id)
-    if not user_result["success"]:
-        await update.message.reply_text(f"❌ **Error:** {user_result['error']}", parse_mode='Markdown')
-        return
-    
-    user = user_result["user"]
-    current_settings = user.get("settings", {})
-    current_settings["default_chain"] = chain
+    # Get current user settings, skipping the read if we have them cached
+    current_settings = settings_cache.get(user_id)
+    if current_settings is None:
+        user_result = await asyncio.to_thread(db_manager.get_user, user_id)
+        if not user_result["success"]:
+            await reply_html(update, ERROR_TMPL.format_map(user_result))
+            return
+        current_settings = user_result["user"].get("settings") or {}
     
-    result = db_manager.update_user_settings(user_id, current_settings)
+    new_settings = {**current_settings, "default_chain": chain}
+    result = await asyncio.to_thread(db_manager.update_user_settings, user_id, new_settings)
     
     if result["success"]:
+        settings_cache[user_id] = result["user"].get("settings") or new_settings
         await update.message.reply_text(
-            f"✅ **Default chain updated to:** {chain.capitalize()}",
-            parse_mode='Markdown'
+            DEFAULT_CHAIN_UPDATED_TMPL.format_map({"chain_cap": CHAIN_DISPLAY.get(chain, chain)})
         )
     else:
-        await update.message.reply_text(
-            f"❌ **Failed to update settings:** {result['error']}",
-            parse_mode='Markdown'
+        await reply_html(
+            update,
+            f"❌ **Failed to update settings:** {result['error']}"
         )
 
 async def help_command(update, context):
     """Show help information"""
-    help_text = """
-❓ **EQ Trading Bot Help**
-
-**🔧 Basic Commands:**
-• `/start` - Welcome message
-• `/test` - Test if bot is working
-• `/help` - Show this help
-
-**🔐 Wallet Management:**
-• `/generate` - Auto-generate fresh wallets for all chains
-• `/connect <name> <private_key> <chain>` - Add existing wallet
-• `/wallets` - View your wallets  
-• `/balance <wallet_name> <chain>` - Check native balance
-• `/token <wallet_name> <chain> <token_address>` - Check token balance
-• `/remove <wallet_name> <chain>` - Remove wallet
-
-**💰 Transaction Commands:**
-• `/deposit <wallet_name> <chain>` - Get deposit address
-• `/send <wallet_name> <chain> <to_address> <amount> [token_address]` - Send transaction
-• `/status <tx_hash> <chain>` - Check transaction status
-• `/gas <wallet_name> <chain> <to_address> <amount> [token_address]` - Estimate gas
-
-**⚙️ Settings:**
-• `/settings` - View your settings
-• `/setchain <chain>` - Set default chain
-• `/setslippage <percentage>` - Set max slippage
-
-**📊 Trading (Coming Soon):**
-• `/buy <token> <amount>` - Manual buy
-• `/sell <token> <amount>` - Manual sell
-• `/autostart <strategy>` - Start auto trading
-
-**🔗 Supported Chains:**
-• Ethereum (ETH)
-• Base (ETH)
-• BSC (BNB)
-• Polygon (MATIC)
-• Solana (SOL)
-
-**💡 Tips:**
-• Keep your private keys secure
-• Start with small amounts for testing
-• Use testnet first if available
-• Real-time balance checking from blockchain
-• Always estimate gas before sending transactions
-    """
-    
-    await update.message.reply_text(help_text, parse_mode='Markdown')
+    await update.message.reply_text(HELP_HTML, parse_mode=ParseMode.HTML)
 
+@command_args(3, USAGE_TOKEN_TEXT, chain_arg=1)
 async def check_token_balance(update, context):
     """Check token balance for a specific wallet"""
-    user_id = str(update.effective_user.id)
-    
-    if not context.args or len(context.args) < 3:
-        await update.message.reply_text(
-            "❌ **Usage:** `/token <wallet_name> <chain> <token_address>`\n\n"
-            "**Example:** `/token mywallet ethereum 0xA0b86a33E6441b8c4C8C1C1C1C1C1C1C1C1C1C1C1`\n\n"
-            "**Supported chains:** ethereum, base, bsc, polygon",
-            parse_mode='Markdown'
-        )
-        return
+    user_id = context.user_data["uid"]
     
     wallet_name = context.args[0]
-    chain = context.args[1].lower()
-    token_address = context.args[2]
+    chain = normalize_chain(context.args[1])
+    token_addresses = [address for address in context.args[2].split(",") if address]
     
-    # Get wallet from database
-    wallet_result = db_manager.get_wallet(user_id, wallet_name, chain)
+    address = await lookup_wallet_address(update, user_id, wallet_name, chain)
+    if address is None:
+        return
     
-    if not wallet_result["success"]:
-        await update.message.reply_text(f"❌ **Error:** {wallet_result['error']}", parse_mode='Markdown')
+    if len(token_addresses) > 1:
+        # Several tokens are fetched with one batched RPC request
+        token_results = await asyncio.to_thread(balance_checker.get_token_balances, address, token_addresses, chain)
+        
+        parts = [f"🪙 **Token Balances for {wallet_name}**\n\n"]
+        parts.append(f"**Chain:** {CHAIN_DISPLAY.get(chain, chain)}\n")
+        parts.append(f"**Address:** `{address}`\n\n")
+        for token_address, token_result in zip(token_addresses, token_results):
+            if token_result["success"]:
+                parts.append(f"• **{token_result['symbol']}:** {token_result['balance']:,.6f}{cached_tag(token_result)}\n")
+            else:
+                parts.append(f"• `{token_address}`: ❌ {token_result['error']}\n")
+        
+        # Per-token failures carry raw error text
+        await reply_html(update, "".join(parts))
         return
     
-    wallet = wallet_result["wallet"]
+    token_address = token_addresses[0] if token_addresses else context.args[2]
     
-    # Get token balance
-    token_result = balance_checker.get_token_balance(wallet["address"], token_address, chain)
+    # Get token balance without blocking the event loop
+    token_result = await asyncio.to_thread(balance_checker.get_token_balance, address, token_address, chain)
     
     if token_result["success"]:
         await update.message.reply_text(
             f"🪙 **Token Balance for {wallet_name}**\n\n"
             f"**Token:** {token_result['symbol']}\n"
-            f"**Chain:** {chain.capitalize()}\n"
-            f"**Address:** `{wallet['address']}`\n"
+            f"**Chain:** {CHAIN_DISPLAY.get(chain, chain)}\n"
+            f"**Address:** `{address}`\n"
             f"**Token Address:** `{token_address}`\n"
-            f"**Balance:** {token_result['balance']:,.6f} {token_result['symbol']}\n"
-            f"**Raw Balance:** {token_result['balance_raw']}",
-            parse_mode='Markdown'
+            f"**Balance:** {token_result['balance']:,.6f} {token_result['symbol']}{cached_tag(token_result)}\n"
+            f"**Raw Balance:** {token_result['balance_raw']}"
         )
     else:
-        await update.message.reply_text(
-            f"❌ **Failed to get token balance:** {token_result['error']}",
-            parse_mode='Markdown'
+        await reply_html(
+            update,
+            f"❌ **Failed to get token balance:** {token_result['error']}"
         )
 
+@command_args(2, USAGE_DEPOSIT_TEXT, chain_arg=1, chains=ALL_CHAINS)
 async def get_deposit_address(update, context):
     """Get deposit address for a wallet"""
-    user_id = str(update.effective_user.id)
-    
-    if not context.args or len(context.args) < 2:
-        await update.message.reply_text(
-            "❌ **Usage:** `/deposit <wallet_name> <chain>`\n\n"
-            "**Example:** `/deposit mywallet ethereum`\n\n"
-            "**Supported chains:** ethereum, base, bsc, polygon, solana",
-            parse_mode='Markdown'
-        )
-        return
+    user_id = context.user_data["uid"]
     
     wallet_name = context.args[0]
-    chain = context.args[1].lower()
+    chain = normalize_chain(context.args[1])
     
     try:
-        # Get wallet from database
-        wallet_result = db_manager.get_wallet(user_id, wallet_name, chain)
-        
-        if not wallet_result["success"]:
-            await update.message.reply_text(f"❌ **Error:** {wallet_result['error']}", parse_mode='Markdown')
+        address = await lookup_wallet_address(update, user_id, wallet_name, chain)
+        if address is None:
             return
         
-        wallet = wallet_result["wallet"]
-        
         # Get deposit address
-        deposit_result = transaction_manager.get_deposit_address(wallet["address"], chain)
+        deposit_result = transaction_manager.get_deposit_address(address, chain)
         
         if deposit_result["success"]:
             await update.message.reply_text(
                 f"💰 **Deposit Address for {wallet_name}**\n\n"
-                f"**Chain:** {chain.capitalize()}\n"
+                f"**Chain:** {CHAIN_DISPLAY.get(chain, chain)}\n"
                 f"**Address:** `{deposit_result['deposit_address']}`\n\n"
                 f"**Note:** {deposit_result['note']}\n\n"
-                f"⚠️ **Warning:** Only send {chain.upper()} to this address!",
-                parse_mode='Markdown'
+                f"⚠️ **Warning:** Only send {chain.upper()} to this address!"
             )
         else:
-            await update.message.reply_text(
-                f"❌ **Failed to get deposit address:** {deposit_result['error']}",
-                parse_mode='Markdown'
+            await reply_html(
+                update,
+                f"❌ **Failed to get deposit address:** {deposit_result['error']}"
             )
     except Exception as e:
-        await update.message.reply_text(
+        await reply_html(
+            update,
             f"❌ **Error:** Unable to get deposit address.\n\n"
-            f"**Error:** {str(e)}",
-            parse_mode='Markdown'
+            f"**Error:** {str(e)}"
         )
 
+@command_args(4, USAGE_SEND_TEXT, chain_arg=1, chains=ALL_CHAINS)
 async def send_transaction(update, context):
     """Send native tokens or ERC-20 tokens"""
-    user_id = str(update.effective_user.id)
-    
-    if not context.args or len(context.args) < 4:
-        await update.message.reply_text(
-            "❌ **Usage:** `/send <wallet_name> <chain> <to_address> <amount> [token_address]`\n\n"
-            "**Examples:**\n"
-            "• `/send mywallet ethereum 0x1234... 0.1` (native token)\n"
-            "• `/send mywallet ethereum 0x1234... 100 0xTokenAddress` (ERC-20 token)\n\n"
-            "**Supported chains:** ethereum, base, bsc, polygon",
-            parse_mode='Markdown'
-        )
-        return
+    user_id = context.user_data["uid"]
     
     wallet_name = context.args[0]
-    chain = context.args[1].lower()
+    chain = normalize_chain(context.args[1])
     to_address = context.args[2]
-    amount = float(context.args[3])
     token_address = context.args[4] if len(context.args) > 4 else None
     
+    # Reject typos before any database or RPC work
+    amount = parse_amount(context.args[3])
+    if amount is None:
+        await update.message.reply_text(INVALID_AMOUNT_TEXT)
+        return
+    
+    if chain != "solana" and not (is_evm_address(to_address) and (token_address is None or is_evm_address(token_address))):
+        await update.message.reply_text(INVALID_ADDRESS_TEXT)
+        return
+    
     try:
-        # Get wallet from database
-        wallet_result = db_manager.get_wallet(user_id, wallet_name, chain)
+        # Get wallet from database, overlapping the gas price lookup on EVM chains
+        if chain == "solana":
+            wallet_result = await asyncio.to_thread(db_manager.get_wallet, user_id, wallet_name, chain)
+            gas_price = None
+        else:
+            wallet_result, gas_result = await asyncio.gather(
+                asyncio.to_thread(db_manager.get_wallet, user_id, wallet_name, chain),
+                # A signed transfer must not be priced from the /gas display cache
+                asyncio.to_thread(transaction_manager.get_gas_price, chain, True)
+            )
+            gas_price = gas_result["gas_price"] if gas_result["success"] else None
         
         if not wallet_result["success"]:
-            await update.message.reply_text(f"❌ **Error:** {wallet_result['error']}", parse_mode='Markdown')
+            await reply_html(update, ERROR_TMPL.format_map(wallet_result))
             return
         
         wallet = wallet_result["wallet"]
         
         # Decrypt private key
-        private_key = db_manager.decrypt_private_key(wallet["encrypted_private_key"])
+        private_key = await asyncio.to_thread(db_manager.decrypt_private_key, wallet["encrypted_private_key"])
         
         # Send transaction
         if token_address:
             # Send ERC-20 token
-            result = transaction_manager.send_token(private_key, to_address, token_address, amount, chain)
+            result = await asyncio.to_thread(transaction_manager.send_token, private_key, to_address, token_address, amount, chain, gas_price)
         else:
             # Send native token
             if chain == "solana":
-                result = transaction_manager.send_sol(private_key, to_address, amount)
+                result = await asyncio.to_thread(transaction_manager.send_sol, private_key, to_address, amount)
             else:
-                result = transaction_manager.send_native_token(private_key, to_address, amount, chain)
+                result = await asyncio.to_thread(transaction_manager.send_native_token, private_key, to_address, amount, chain, gas_price)
         
         if result["success"]:
             await update.message.reply_text(
-                f"✅ **Transaction Sent Successfully!**\n\n"
-                f"**From:** {wallet_name}\n"
-                f"**To:** `{to_address}`\n"
-                f"**Amount:** {amount}\n"
-                f"**Chain:** {chain.capitalize()}\n"
-                f"**Transaction Hash:** `{result['tx_hash']}`\n"
-                f"**Status:** {result['status']}\n\n"
-                f"Use `/status {result['tx_hash']} {chain}` to check status",
-                parse_mode='Markdown'
+                TRANSACTION_SENT_TMPL.format_map({
+                    "name": wallet_name,
+                    "to": to_address,
+                    "amount": amount,
+                    "chain_cap": CHAIN_DISPLAY.get(chain, chain),
+                    "tx_hash": result['tx_hash'],
+                    "status": result['status'],
+                    "chain": chain
+                })
             )
         else:
-            await update.message.reply_text(
-                f"❌ **Transaction Failed:** {result['error']}",
-                parse_mode='Markdown'
+            await reply_html(
+                update,
+                f"❌ **Transaction Failed:** {result['error']}"
             )
     except Exception as e:
-        await update.message.reply_text(
+        await reply_html(
+            update,
             f"❌ **Error:** Unable to send transaction.\n\n"
-            f"**Error:** {str(e)}",
-            parse_mode='Markdown'
+            f"**Error:** {str(e)}"
         )
 
+@command_args(2, USAGE_STATUS_TEXT, chain_arg=1, chains=ALL_CHAINS)
 async def check_transaction_status(update, context):
     """Check transaction status"""
-    if not context.args or len(context.args) < 2:
-        await update.message.reply_text(
-            "❌ **Usage:** `/status <tx_hash> <chain>`\n\n"
-            "**Example:** `/status 0x1234... ethereum`\n\n"
-            "**Supported chains:** ethereum, base, bsc, polygon, solana",
-            parse_mode='Markdown'
-        )
-        return
-    
     tx_hash = context.args[0]
-    chain = context.args[1].lower()
+    chain = normalize_chain(context.args[1])
     
     try:
         # Get transaction status
-        result = transaction_manager.get_transaction_status(tx_hash, chain)
+        result = await asyncio.to_thread(transaction_manager.get_transaction_status, tx_hash, chain)
         
         if result["success"]:
-            status_text = f"📊 **Transaction Status**\n\n"
-            status_text += f"**Hash:** `{tx_hash}`\n"
-            status_text += f"**Chain:** {chain.capitalize()}\n"
-            status_text += f"**Status:** {result['status']}\n"
+            parts = []
             
             if 'block_number' in result:
-                status_text += f"**Block:** {result['block_number']}\n"
+                parts.append(f"**Block:** {result['block_number']}\n")
             
             if 'confirmations' in result:
-                status_text += f"**Confirmations:** {result['confirmations']}\n"
+                parts.append(f"**Confirmations:** {result['confirmations']}\n")
             
             if 'gas_used' in result:
-                status_text += f"**Gas Used:** {result['gas_used']}\n"
+                parts.append(f"**Gas Used:** {result['gas_used']}\n")
             
-            await update.message.reply_text(status_text, parse_mode='Markdown')
-        else:
             await update.message.reply_text(
-                f"❌ **Failed to get transaction status:** {result['error']}",
-                parse_mode='Markdown'
+                TX_STATUS_TMPL.format_map({
+                    "tx_hash": tx_hash,
+                    "chain_cap": CHAIN_DISPLAY.get(chain, chain),
+                    "status": result['status'],
+                    "extra": "".join(parts)
+                })
+            )
+        else:
+            await reply_html(
+                update,
+                f"❌ **Failed to get transaction status:** {result['error']}"
             )
     except Exception as e:
-        await update.message.reply_text(
+        await reply_html(
+            update,
             f"❌ **Error:** Unable to check transaction status.\n\n"
-            f"**Error:** {str(e)}",
-            parse_mode='Markdown'
+            f"**Error:** {str(e)}"
         )
 
+@command_args(4, USAGE_GAS_TEXT, chain_arg=1)
 async def estimate_gas(update, context):
     """Estimate gas for a transaction"""
-    user_id = str(update.effective_user.id)
-    
-    if not context.args or len(context.args) < 4:
-        await update.message.reply_text(
-            "❌ **Usage:** `/gas <wallet_name> <chain> <to_address> <amount> [token_address]`\n\n"
-            "**Examples:**\n"
-            "• `/gas mywallet ethereum 0x1234... 0.1` (native token)\n"
-            "• `/gas mywallet ethereum 0x1234... 100 0xTokenAddress` (ERC-20 token)\n\n"
-            "**Supported chains:** ethereum, base, bsc, polygon",
-            parse_mode='Markdown'
-        )
-        return
+    user_id = context.user_data["uid"]
     
     wallet_name = context.args[0]
-    chain = context.args[1].lower()
+    chain = normalize_chain(context.args[1])
     to_address = context.args[2]
-    amount = float(context.args[3])
     token_address = context.args[4] if len(context.args) > 4 else None
     
+    # Reject typos before any database or RPC work
+    amount = parse_amount(context.args[3])
+    if amount is None:
+        await update.message.reply_text(INVALID_AMOUNT_TEXT)
+        return
+    
+    if chain != "solana" and not (is_evm_address(to_address) and (token_address is None or is_evm_address(token_address))):
+        await update.message.reply_text(INVALID_ADDRESS_TEXT)
+        return
+    
     try:
-        # Get wallet from database
-        wallet_result = db_manager.get_wallet(user_id, wallet_name, chain)
-        
-        if not wallet_result["success"]:
-            await update.message.reply_text(f"❌ **Error:** {wallet_result['error']}", parse_mode='Markdown')
+        address = await lookup_wallet_address(update, user_id, wallet_name, chain)
+        if address is None:
             return
         
-        wallet = wallet_result["wallet"]
-        
         # Estimate gas
-        result = transaction_manager.estimate_gas(wallet["address"], to_address, amount, chain, token_address)
+        result = await asyncio.to_thread(transaction_manager.estimate_gas, address, to_address, amount, chain, token_address)
         
         if result["success"]:
-            gas_text = f"⛽ **Gas Estimation**\n\n"
-            gas_text += f"**From:** {wallet_name}\n"
-            gas_text += f"**To:** `{to_address}`\n"
-            gas_text += f"**Amount:** {amount}\n"
-            gas_text += f"**Chain:** {chain.capitalize()}\n"
-            gas_text += f"**Type:** {result['transaction_type']}\n\n"
-            gas_text += f"**Estimated Gas:** {result['estimated_gas']}\n"
-            gas_text += f"**Gas Price:** {result['gas_price']} wei\n"
-            gas_text += f"**Total Cost:** {result['total_cost_eth']:.6f} {chain.upper()}\n"
-            gas_text += f"**Total Cost (Wei):** {result['total_cost_wei']}"
-            
-            await update.message.reply_text(gas_text, parse_mode='Markdown')
-        else:
             await update.message.reply_text(
-                f"❌ **Failed to estimate gas:** {result['error']}",
-                parse_mode='Markdown'
+                GAS_ESTIMATE_TMPL.format_map({
+                    "name": wallet_name,
+                    "to": to_address,
+                    "amount": amount,
+                    "chain_cap": CHAIN_DISPLAY.get(chain, chain),
+                    "tx_type": result['transaction_type'],
+                    "gas": result['estimated_gas'],
+                    "gas_price": result['gas_price'],
+                    "cost": result['total_cost_eth'],
+                    "sym": chain.upper(),
+                    "cost_wei": result['total_cost_wei']
+                })
+            )
+        else:
+            await reply_html(
+                update,
+                f"❌ **Failed to estimate gas:** {result['error']}"
             )
     except Exception as e:
-        await update.message.reply_text(
+        await reply_html(
+            update,
             f"❌ **Error:** Unable to estimate gas.\n\n"
-            f"**Error:** {str(e)}",
-            parse_mode='Markdown'
+            f"**Error:** {str(e)}"
         )
 
 def setup_application():
     """Setup the application with all handlers"""
     global application
     if not TELEGRAM_TOKEN:
-        print("Error: TELEGRAM_TOKEN environment variable not set")
+        logger.error("TELEGRAM_TOKEN environment variable not set")
         return None
     
-    print(f"Starting bot with token: {TELEGRAM_TOKEN[:10]}...")
+    logger.info("Starting bot with token: %s...", TELEGRAM_TOKEN[:10])
+    
+    application = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .concurrent_updates(PerChatUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        # Replies are Markdown unless a handler passes its own parse_mode
+        .defaults(Defaults(parse_mode=ParseMode.MARKDOWN))
+        .build()
+    )
     
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    # Runs before every command handler so they can read context.user_data["uid"]
+    application.add_handler(TypeHandler(Update, attach_user_id), group=-1)
     
     # Add command handlers
     application.add_handler(CommandHandler("start", start))
@@ -978,45 +1305,37 @@ def setup_application():
     return application
 
 async def setup_webhook():
-    """Setup webhook in proper async context"""
+    """Setup webhook on the running server event loop"""
     global application
     
     application = setup_application()
     if not application:
         return
     
-    print("Bot is starting...")
+    logger.info("Bot is starting...")
     await application.initialize()
     await application.start()
     
-    # Set webhook to the new service URL
-    webhook_url = "https://eq-auto-trading-telegram-bot-1.onrender.com/webhook"
-    await application.bot.set_webhook(url=webhook_url)
-    print(f"Webhook set to: {webhook_url}")
-    
-    # Keep the event loop running
-    try:
-        while True:
-            await asyncio.sleep(1)
-    except KeyboardInterrupt:
-        print("Shutting down bot...")
-        await application.stop()
+    # Register the webhook the way run_webhook would, but keep serving it ourselves
+    await application.bot.set_webhook(
+        url=WEBHOOK_URL,
+        secret_token=WEBHOOK_SECRET_TOKEN,
+        # Only command messages have handlers; skip delivery of everything else
+        allowed_updates=["message"],
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        drop_pending_updates=DROP_PENDING_UPDATES
+    )
+    logger.info("Webhook set to: %s", WEBHOOK_URL)
 
 def main():
-    # Start bot setup in background thread with proper event loop
-    def run_bot():
-        asyncio.run(setup_webhook())
-    
-    bot_thread = threading.Thread(target=run_bot)
-    bot_thread.daemon = True
-    bot_thread.start()
-    
-    # Give the bot time to start
-    import time
-    time.sleep(3)
-    
-    # Start HTTP server in main thread
-    run_http_server()
+    # Bot and HTTP server share the uvicorn event loop
+    port = int(os.environ.get('PORT', 10000))
+    # Always one process: the Application, its in-memory caches and set_webhook
+    # are per process, so several workers would diverge and fight over the webhook
+    if int(os.environ.get('WEB_CONCURRENCY', 1)) > 1:
+        logger.warning("WEB_CONCURRENCY > 1 is not supported; running a single worker")
+    logger.info("Starting HTTP server on port %s", port)
+    uvicorn.run(web_app, host="0.0.0.0", port=port, loop=UVICORN_LOOP, http=UVICORN_HTTP)
 
 if __name__ == "__main__":
-    main() 
+    main() 
\ No newline at end of file
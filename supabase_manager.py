@@ -1,9 +1,14 @@
 import os
+import logging
 import json
+import threading
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from cryptography.fernet import Fernet
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
 
 class SupabaseManager:
     def __init__(self):
@@ -14,16 +19,92 @@ class SupabaseManager:
         if not self.supabase_url or not self.supabase_key:
             raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY environment variables are required")
         
-        self.client: Client = create_client(self.supabase_url, self.supabase_key)
+        # One client for the process: its PostgREST session keeps connections to Supabase alive
+        self.client: Client = create_client(
+            self.supabase_url,
+            self.supabase_key,
+            options=ClientOptions(
+                postgrest_client_timeout=int(os.environ.get('SUPABASE_TIMEOUT', '10')),
+                auto_refresh_token=False,
+                persist_session=False
+            )
+        )
         
         # Initialize encryption key
         self.encryption_key = os.environ.get("ENCRYPTION_KEY")
         if not self.encryption_key:
             # Generate new key if not exists
             self.encryption_key = Fernet.generate_key().decode()
-            print(f"Generated new encryption key: {self.encryption_key}")
+            logger.warning("Generated new encryption key: %s", self.encryption_key)
         
         self.cipher = Fernet(self.encryption_key.encode())
+        
+        # User and wallet rows change rarely; most commands only read them
+        cache_ttl = int(os.environ.get('DB_CACHE_TTL', '60'))
+        self._user_cache = TTLCache(maxsize=10_000, ttl=cache_ttl)
+        self._wallet_cache = TTLCache(maxsize=10_000, ttl=cache_ttl)
+        
+        # A user's row id never changes, so keep it well past the user row TTL
+        self._user_ids = TTLCache(maxsize=100_000, ttl=int(os.environ.get('USER_ID_CACHE_TTL', '3600')))
+        self._cache_lock = threading.Lock()
+        self._inflight_locks = {}
+        
+        # Decrypted keys for recently used wallets, keyed by ciphertext; bounded in size and age
+        self._decrypted_keys = TTLCache(maxsize=256, ttl=int(os.environ.get('KEY_CACHE_TTL', '600')))
+    
+    def _cached(self, cache: TTLCache, key, fetch) -> Dict:
+        """Return a cached successful result, letting only one caller per key hit Supabase"""
+        with self._cache_lock:
+            if key in cache:
+                return cache[key]
+            inflight_lock = self._inflight_locks.setdefault((id(cache), key), threading.Lock())
+        
+        with inflight_lock:
+            with self._cache_lock:
+                if key in cache:
+                    return cache[key]
+            
+            result = fetch()
+            
+            with self._cache_lock:
+                if result.get("success"):
+                    cache[key] = result
+                self._inflight_locks.pop((id(cache), key), None)
+            
+            return result
+    
+    def _get_user_id(self, telegram_id: int) -> Dict:
+        """Get the user's row id, fetching the user row only on a cache miss"""
+        key = str(telegram_id)
+        with self._cache_lock:
+            user_id = self._user_ids.get(key)
+        
+        if user_id is None:
+            user_result = self.get_user(telegram_id)
+            if not user_result["success"]:
+                return user_result
+            
+            user_id = user_result["user"]["id"]
+            with self._cache_lock:
+                self._user_ids[key] = user_id
+        
+        return {"success": True, "user_id": user_id}
+    
+    def _select_owned(self, table: str, telegram_id: int):
+        """Select a user's rows from a table in one request, whether or not their row id is cached"""
+        with self._cache_lock:
+            user_id = self._user_ids.get(str(telegram_id))
+        
+        if user_id is not None:
+            return self.client.table(table).select("*").eq("user_id", user_id)
+        
+        # Filter on the embedded users row instead of looking the user up first
+        return self.client.table(table).select("*, users!inner(telegram_id)").eq("users.telegram_id", str(telegram_id))
+    
+    def _invalidate(self, cache: TTLCache, key):
+        """Drop a cached row after a write"""
+        with self._cache_lock:
+            cache.pop(key, None)
     
     def encrypt_private_key(self, private_key: str) -> str:
         """Encrypt private key for storage"""
@@ -31,10 +112,16 @@ class SupabaseManager:
     
     def decrypt_private_key(self, encrypted_key: str) -> str:
         """Decrypt private key for use"""
-        return self.cipher.decrypt(encrypted_key.encode()).decode()
+        with self._cache_lock:
+            private_key = self._decrypted_keys.get(encrypted_key)
+        if private_key is None:
+            private_key = self.cipher.decrypt(encrypted_key.encode()).decode()
+            with self._cache_lock:
+                self._decrypted_keys[encrypted_key] = private_key
+        return private_key
     
     # User Management
-    def create_user(self, telegram_id: str, username: str = None, first_name: str = None, last_name: str = None) -> Dict:
+    def create_user(self, telegram_id: int, username: str = None, first_name: str = None, last_name: str = None) -> Dict:
         """Create a new user"""
         try:
             user_data = {
@@ -50,6 +137,7 @@ class SupabaseManager:
             }
             
             result = self.client.table("users").insert(user_data).execute()
+            self._invalidate(self._user_cache, str(telegram_id))
             
             if result.data:
                 return {"success": True, "user": result.data[0]}
@@ -59,8 +147,35 @@ class SupabaseManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def get_user(self, telegram_id: str) -> Dict:
+    def upsert_user(self, telegram_id: int, username: str = None, first_name: str = None, last_name: str = None) -> Dict:
+        """Create a user if missing, in one round trip; existing rows are left untouched"""
+        try:
+            user_data = {
+                "telegram_id": str(telegram_id),
+                "username": username,
+                "first_name": first_name,
+                "last_name": last_name,
+                "settings": {
+                    "default_chain": "ethereum",
+                    "max_slippage": 5.0,
+                    "notifications": True
+                }
+            }
+            
+            self.client.table("users").upsert(user_data, on_conflict="telegram_id", ignore_duplicates=True).execute()
+            self._invalidate(self._user_cache, str(telegram_id))
+            
+            return {"success": True}
+                
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def get_user(self, telegram_id: int) -> Dict:
         """Get user by Telegram ID"""
+        return self._cached(self._user_cache, str(telegram_id), lambda: self._fetch_user(telegram_id))
+    
+    def _fetch_user(self, telegram_id: int) -> Dict:
+        """Fetch user by Telegram ID from Supabase"""
         try:
             result = self.client.table("users").select("*").eq("telegram_id", str(telegram_id)).execute()
             
@@ -72,10 +187,11 @@ class SupabaseManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def update_user_settings(self, telegram_id: str, settings: Dict) -> Dict:
+    def update_user_settings(self, telegram_id: int, settings: Dict) -> Dict:
         """Update user settings"""
         try:
             result = self.client.table("users").update({"settings": settings}).eq("telegram_id", str(telegram_id)).execute()
+            self._invalidate(self._user_cache, str(telegram_id))
             
             if result.data:
                 return {"success": True, "user": result.data[0]}
@@ -86,63 +202,57 @@ class SupabaseManager:
             return {"success": False, "error": str(e)}
     
     # Wallet Management
-    def add_wallet(self, telegram_id: str, name: str, private_key: str, chain: str) -> Dict:
+    def add_wallet(self, telegram_id: int, name: str, address: str, private_key: str, chain: str) -> Dict:
         """Add a new wallet for user"""
         try:
             # Get user first
-            user_result = self.get_user(telegram_id)
+            user_result = self._get_user_id(telegram_id)
             if not user_result["success"]:
                 return user_result
             
-            user = user_result["user"]
+            user_id = user_result["user_id"]
             
             # Encrypt private key
             encrypted_key = self.encrypt_private_key(private_key)
             
             wallet_data = {
-                "user_id": user["id"],
+                "user_id": user_id,
                 "name": name,
-                "address": "",  # Will be set after validation
+                "address": address,
                 "encrypted_private_key": encrypted_key,
                 "chain": chain.lower()
             }
             
             result = self.client.table("wallets").insert(wallet_data).execute()
+            self._invalidate(self._wallet_cache, (str(telegram_id), name, chain.lower()))
             
             if result.data:
-                return {"success": True, "wallet": result.data[0]}
+                return {"success": True, "wallet": result.data[0], "wallet_address": address}
             else:
                 return {"success": False, "error": "Failed to add wallet"}
                 
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def get_user_wallets(self, telegram_id: str) -> Dict:
+    def get_user_wallets(self, telegram_id: int) -> Dict:
         """Get all wallets for a user"""
         try:
-            user_result = self.get_user(telegram_id)
-            if not user_result["success"]:
-                return user_result
-            
-            user = user_result["user"]
-            
-            result = self.client.table("wallets").select("*").eq("user_id", user["id"]).execute()
+            result = self._select_owned("wallets", telegram_id).execute()
             
             return {"success": True, "wallets": result.data}
                 
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def get_wallet(self, telegram_id: str, wallet_name: str, chain: str) -> Dict:
+    def get_wallet(self, telegram_id: int, wallet_name: str, chain: str) -> Dict:
         """Get specific wallet"""
+        key = (str(telegram_id), wallet_name, chain.lower())
+        return self._cached(self._wallet_cache, key, lambda: self._fetch_wallet(telegram_id, wallet_name, chain))
+    
+    def _fetch_wallet(self, telegram_id: int, wallet_name: str, chain: str) -> Dict:
+        """Fetch specific wallet from Supabase"""
         try:
-            user_result = self.get_user(telegram_id)
-            if not user_result["success"]:
-                return user_result
-            
-            user = user_result["user"]
-            
-            result = self.client.table("wallets").select("*").eq("user_id", user["id"]).eq("name", wallet_name).eq("chain", chain.lower()).execute()
+            result = self._select_owned("wallets", telegram_id).eq("name", wallet_name).eq("chain", chain.lower()).execute()
             
             if result.data:
                 return {"success": True, "wallet": result.data[0]}
@@ -152,16 +262,22 @@ class SupabaseManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def remove_wallet(self, telegram_id: str, wallet_name: str, chain: str) -> Dict:
+    def remove_wallet(self, telegram_id: int, wallet_name: str, chain: str) -> Dict:
         """Remove a wallet"""
         try:
-            user_result = self.get_user(telegram_id)
+            user_result = self._get_user_id(telegram_id)
             if not user_result["success"]:
                 return user_result
             
-            user = user_result["user"]
+            user_id = user_result["user_id"]
+            
+            result = self.client.table("wallets").delete().eq("user_id", user_id).eq("name", wallet_name).eq("chain", chain.lower()).execute()
+            self._invalidate(self._wallet_cache, (str(telegram_id), wallet_name, chain.lower()))
             
-            result = self.client.table("wallets").delete().eq("user_id", user["id"]).eq("name", wallet_name).eq("chain", chain.lower()).execute()
+            # Forget decrypted keys of the removed wallets
+            with self._cache_lock:
+                for wallet in result.data or []:
+                    self._decrypted_keys.pop(wallet.get("encrypted_private_key"), None)
             
             if result.data:
                 return {"success": True, "message": "Wallet removed successfully"}
@@ -189,17 +305,17 @@ class SupabaseManager:
             return {"success": False, "error": str(e)}
     
     # Transaction Management
-    def add_transaction(self, telegram_id: str, wallet_id: str, tx_data: Dict) -> Dict:
+    def add_transaction(self, telegram_id: int, wallet_id: str, tx_data: Dict) -> Dict:
         """Add a new transaction"""
         try:
-            user_result = self.get_user(telegram_id)
+            user_result = self._get_user_id(telegram_id)
             if not user_result["success"]:
                 return user_result
             
-            user = user_result["user"]
+            user_id = user_result["user_id"]
             
             transaction_data = {
-                "user_id": user["id"],
+                "user_id": user_id,
                 "wallet_id": wallet_id,
                 **tx_data
             }
@@ -214,16 +330,10 @@ class SupabaseManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def get_user_transactions(self, telegram_id: str, limit: int = 50) -> Dict:
+    def get_user_transactions(self, telegram_id: int, limit: int = 50) -> Dict:
         """Get user's transaction history"""
         try:
-            user_result = self.get_user(telegram_id)
-            if not user_result["success"]:
-                return user_result
-            
-            user = user_result["user"]
-            
-            result = self.client.table("transactions").select("*").eq("user_id", user["id"]).order("created_at", desc=True).limit(limit).execute()
+            result = self._select_owned("transactions", telegram_id).order("created_at", desc=True).limit(limit).execute()
             
             return {"success": True, "transactions": result.data}
                 
@@ -231,17 +341,17 @@ class SupabaseManager:
             return {"success": False, "error": str(e)}
     
     # Strategy Management
-    def add_strategy(self, telegram_id: str, name: str, strategy_type: str, parameters: Dict) -> Dict:
+    def add_strategy(self, telegram_id: int, name: str, strategy_type: str, parameters: Dict) -> Dict:
         """Add a new trading strategy"""
         try:
-            user_result = self.get_user(telegram_id)
+            user_result = self._get_user_id(telegram_id)
             if not user_result["success"]:
                 return user_result
             
-            user = user_result["user"]
+            user_id = user_result["user_id"]
             
             strategy_data = {
-                "user_id": user["id"],
+                "user_id": user_id,
                 "name": name,
                 "strategy_type": strategy_type,
                 "parameters": parameters
@@ -257,16 +367,10 @@ class SupabaseManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def get_user_strategies(self, telegram_id: str) -> Dict:
+    def get_user_strategies(self, telegram_id: int) -> Dict:
         """Get user's strategies"""
         try:
-            user_result = self.get_user(telegram_id)
-            if not user_result["success"]:
-                return user_result
-            
-            user = user_result["user"]
-            
-            result = self.client.table("strategies").select("*").eq("user_id", user["id"]).execute()
+            result = self._select_owned("strategies", telegram_id).execute()
             
             return {"success": True, "strategies": result.data}
                 
@@ -274,17 +378,17 @@ class SupabaseManager:
             return {"success": False, "error": str(e)}
     
     # Portfolio Management
-    def update_portfolio(self, telegram_id: str, wallet_id: str, token_data: Dict) -> Dict:
+    def update_portfolio(self, telegram_id: int, wallet_id: str, token_data: Dict) -> Dict:
         """Update portfolio with token data"""
         try:
-            user_result = self.get_user(telegram_id)
+            user_result = self._get_user_id(telegram_id)
             if not user_result["success"]:
                 return user_result
             
-            user = user_result["user"]
+            user_id = user_result["user_id"]
             
             portfolio_data = {
-                "user_id": user["id"],
+                "user_id": user_id,
                 "wallet_id": wallet_id,
                 **token_data
             }
@@ -300,16 +404,10 @@ class SupabaseManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def get_user_portfolio(self, telegram_id: str) -> Dict:
+    def get_user_portfolio(self, telegram_id: int) -> Dict:
         """Get user's portfolio"""
         try:
-            user_result = self.get_user(telegram_id)
-            if not user_result["success"]:
-                return user_result
-            
-            user = user_result["user"]
-            
-            result = self.client.table("portfolios").select("*").eq("user_id", user["id"]).execute()
+            result = self._select_owned("portfolios", telegram_id).execute()
             
             return {"success": True, "portfolio": result.data}
                 
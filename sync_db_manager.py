@@ -1,10 +1,13 @@
 import os
+import logging
 import json
 import requests
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from cryptography.fernet import Fernet
 
+logger = logging.getLogger(__name__)
+
 class SyncDatabaseManager:
     """Synchronous database manager using direct HTTP requests to Supabase REST API"""
     
@@ -21,7 +24,7 @@ class SyncDatabaseManager:
         if not self.encryption_key:
             # Generate new key if not exists
             self.encryption_key = Fernet.generate_key().decode()
-            print(f"Generated new encryption key: {self.encryption_key}")
+            logger.warning("Generated new encryption key: %s", self.encryption_key)
         
         self.cipher = Fernet(self.encryption_key.encode())
         
@@ -1,4 +1,7 @@
 import os
+import logging
+import threading
+import time
 from typing import Dict, List, Optional
 from web3 import Web3
 from eth_account import Account
@@ -12,6 +15,25 @@ except ImportError:
     TransferParams = None
     transfer = None
 import requests
+import orjson
+from cachetools import LRUCache, TTLCache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Rounds over a chain's endpoints before giving up, with exponential backoff between rounds.
+# These are the only retries for reads: a call fails after at most RPC_MAX_RETRIES x
+# endpoints x the 10s request timeout plus the backoff sleeps (~31s with the defaults)
+RPC_MAX_RETRIES = max(1, int(os.environ.get('RPC_MAX_RETRIES', '3')))
+RPC_RETRY_BASE_DELAY = int(os.environ.get('RPC_RETRY_BASE_DELAY_MS', '250')) / 1000
+
+def _is_retryable(error: Exception) -> bool:
+    """Network failures, timeouts, rate limits and 5xx replies are worth trying elsewhere"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
 
 class TransactionManager:
     def __init__(self):
@@ -23,21 +45,99 @@ class TransactionManager:
             'polygon': os.environ.get('POLYGON_RPC', 'https://polygon-rpc.com'),
         }
         
+        # One pooled keep-alive session shared by every chain's provider. No retries:
+        # a replayed eth_sendRawTransaction POST should surface as an error, not resend
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=int(os.environ.get('RPC_POOL_CONNECTIONS', '32')),
+            pool_maxsize=int(os.environ.get('RPC_POOL_MAXSIZE', '128'))
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        
         # Initialize Web3 connections
         self.web3_connections = {}
         for chain, endpoint in self.rpc_endpoints.items():
             try:
-                self.web3_connections[chain] = Web3(Web3.HTTPProvider(endpoint))
+                self.web3_connections[chain] = self._http_web3(endpoint)
             except Exception as e:
-                print(f"Failed to connect to {chain}: {e}")
+                logger.error("Failed to connect to %s: %s", chain, e)
+        
+        # Read-only calls fall back to these when the primary endpoint is down;
+        # opt in per chain with a comma-separated <CHAIN>_RPC_FALLBACKS env var
+        self.fallback_connections = {}
+        for chain in self.rpc_endpoints:
+            urls = [url.strip() for url in os.environ.get(f'{chain.upper()}_RPC_FALLBACKS', '').split(',') if url.strip()]
+            if urls:
+                logger.info("Using %d fallback RPC endpoint(s) for %s", len(urls), chain)
+            self.fallback_connections[chain] = [self._http_web3(url) for url in urls]
+        
+        # Gas prices barely move within a block or two, and estimates for the same
+        # transfer are stable over that window; both are kept for GAS_CACHE_TTL seconds
+        gas_ttl = int(os.environ.get('GAS_CACHE_TTL', '12'))
+        self._gas_prices = TTLCache(maxsize=16, ttl=gas_ttl)
+        self._gas_estimates = TTLCache(maxsize=1000, ttl=gas_ttl)
+        self._cache_lock = threading.Lock()
+        
+        # Mined receipts never change, so /status only needs a fresh block height for them
+        self._receipts = LRUCache(maxsize=10_000)
+        self._block_numbers = TTLCache(maxsize=16, ttl=gas_ttl)
         
         # Initialize Solana client
         try:
             self.solana_client = SolanaClient(os.environ.get('SOLANA_RPC', 'https://api.mainnet-beta.solana.com'))
         except Exception as e:
-            print(f"Failed to initialize Solana client: {e}")
+            logger.error("Failed to initialize Solana client: %s", e)
             self.solana_client = None
     
+    def _http_web3(self, url: str) -> Web3:
+        """Web3 over the pooled session without HTTPProvider's own retry middleware"""
+        provider = Web3.HTTPProvider(url, session=self._session, request_kwargs={'timeout': 10})
+        # web3 would retry each request up to 5 times underneath _call_with_fallback's rounds
+        provider.middlewares = ()
+        return Web3(provider)
+    
+    def _call_with_fallback(self, chain: str, call):
+        """Run a read-only call(web3) against the chain's endpoints in priority order"""
+        providers = [self.web3_connections[chain], *self.fallback_connections.get(chain, [])]
+        last_error = None
+        
+        for attempt in range(RPC_MAX_RETRIES):
+            if attempt:
+                time.sleep(RPC_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+            for web3 in providers:
+                try:
+                    return call(web3)
+                except Exception as e:
+                    if not _is_retryable(e):
+                        raise
+                    last_error = e
+                    logger.warning("RPC call on %s failed, trying next endpoint: %s", chain, e)
+        
+        raise last_error
+    
+    def _rpc_batch(self, chain: str, calls: List[tuple]) -> List[Dict]:
+        """Send several JSON-RPC calls to a chain's endpoint in one HTTP POST"""
+        payload = [
+            {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+            for request_id, (method, params) in enumerate(calls)
+        ]
+        response = self._session.post(
+            self.rpc_endpoints[chain],
+            data=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=10
+        )
+        response.raise_for_status()
+        
+        replies = orjson.loads(response.content)
+        if not isinstance(replies, list):
+            raise ValueError("Endpoint does not support JSON-RPC batching")
+        
+        # Replies may come back in any order
+        by_id = {reply.get("id"): reply for reply in replies}
+        return [by_id.get(request_id, {}) for request_id in range(len(calls))]
+    
     def get_deposit_address(self, wallet_address: str, chain: str) -> Dict:
         """Get deposit address for a wallet (same as wallet address for now)"""
         try:
@@ -61,7 +161,30 @@ class TransactionManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def send_native_token(self, from_private_key: str, to_address: str, amount: float, chain: str) -> Dict:
+    def _cached_gas_price(self, chain: str, fresh: bool = False) -> int:
+        """Get a chain's gas price, reusing one fetched in the last few seconds unless fresh is set"""
+        with self._cache_lock:
+            gas_price = None if fresh else self._gas_prices.get(chain)
+        
+        if gas_price is None:
+            gas_price = self._call_with_fallback(chain, lambda web3: web3.eth.gas_price)
+            with self._cache_lock:
+                self._gas_prices[chain] = gas_price
+        
+        return gas_price
+    
+    def get_gas_price(self, chain: str, fresh: bool = False) -> Dict:
+        """Get the current gas price for a chain; pass fresh=True when signing a transaction"""
+        try:
+            if chain not in self.web3_connections:
+                return {"success": False, "error": f"Unsupported chain: {chain}"}
+            
+            return {"success": True, "gas_price": self._cached_gas_price(chain, fresh)}
+            
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def send_native_token(self, from_private_key: str, to_address: str, amount: float, chain: str, gas_price: int = None) -> Dict:
         """Send native tokens (ETH, BNB, MATIC)"""
         try:
             if chain not in self.web3_connections:
@@ -80,8 +203,9 @@ class TransactionManager:
             # Convert amount to wei
             amount_wei = web3.to_wei(amount, 'ether')
             
-            # Get gas price
-            gas_price = web3.eth.gas_price
+            # Get gas price unless the caller already fetched it
+            if gas_price is None:
+                gas_price = web3.eth.gas_price
             
             # Estimate gas
             gas_estimate = web3.eth.estimate_gas({
@@ -168,7 +292,7 @@ class TransactionManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def send_token(self, from_private_key: str, to_address: str, token_address: str, amount: float, chain: str) -> Dict:
+    def send_token(self, from_private_key: str, to_address: str, token_address: str, amount: float, chain: str, gas_price: int = None) -> Dict:
         """Send ERC-20 tokens"""
         try:
             if chain not in self.web3_connections:
@@ -222,7 +346,7 @@ class TransactionManager:
             transaction = contract.functions.transfer(to_address, amount_raw).build_transaction({
                 'from': from_address,
                 'gas': 100000,  # Standard gas limit for token transfer
-                'gasPrice': web3.eth.gas_price,
+                'gasPrice': gas_price if gas_price is not None else web3.eth.gas_price,
                 'nonce': web3.eth.get_transaction_count(from_address)
             })
             
@@ -260,45 +384,22 @@ class TransactionManager:
             
             web3 = self.web3_connections[chain]
             
-            if token_address:
-                # ERC-20 token transfer
-                abi = [
-                    {
-                        "constant": False,
-                        "inputs": [
-                            {"name": "_to", "type": "address"},
-                            {"name": "_value", "type": "uint256"}
-                        ],
-                        "name": "transfer",
-                        "outputs": [{"name": "", "type": "bool"}],
-                        "type": "function"
-                    }
-                ]
-                
-                contract = web3.eth.contract(address=token_address, abi=abi)
-                decimals = contract.functions.decimals().call()
-                amount_raw = int(amount * (10 ** decimals))
-                
-                transaction = contract.functions.transfer(to_address, amount_raw).build_transaction({
-                    'from': from_address,
-                    'gas': 100000,
-                    'gasPrice': web3.eth.gas_price,
-                    'nonce': web3.eth.get_transaction_count(from_address)
-                })
-            else:
-                # Native token transfer
-                amount_wei = web3.to_wei(amount, 'ether')
-                transaction = {
-                    'from': from_address,
-                    'to': to_address,
-                    'value': amount_wei,
-                    'gas': 21000,
-                    'gasPrice': web3.eth.gas_price
-                }
+            # Get gas price once and reuse it for the estimate and the cost
+            gas_price = self._cached_gas_price(chain)
+            
+            # Repeat /gas calls for the same transfer reuse the recent estimate
+            estimate_key = (chain, from_address, to_address, amount, token_address)
+            with self._cache_lock:
+                estimated_gas = self._gas_estimates.get(estimate_key)
+            
+            if estimated_gas is None:
+                estimated_gas = self._call_with_fallback(
+                    chain,
+                    lambda web3: self._estimate_transfer_gas(web3, from_address, to_address, amount, token_address, gas_price)
+                )
+                with self._cache_lock:
+                    self._gas_estimates[estimate_key] = estimated_gas
             
-            # Estimate gas
-            estimated_gas = web3.eth.estimate_gas(transaction)
-            gas_price = web3.eth.gas_price
             total_cost = estimated_gas * gas_price
             
             return {
@@ -313,6 +414,46 @@ class TransactionManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _estimate_transfer_gas(self, web3: Web3, from_address: str, to_address: str, amount: float, token_address: Optional[str], gas_price: int) -> int:
+        """Run eth_estimateGas for a native or ERC-20 transfer"""
+        if token_address:
+            # ERC-20 token transfer
+            abi = [
+                {
+                    "constant": False,
+                    "inputs": [
+                        {"name": "_to", "type": "address"},
+                        {"name": "_value", "type": "uint256"}
+                    ],
+                    "name": "transfer",
+                    "outputs": [{"name": "", "type": "bool"}],
+                    "type": "function"
+                }
+            ]
+            
+            contract = web3.eth.contract(address=token_address, abi=abi)
+            decimals = contract.functions.decimals().call()
+            amount_raw = int(amount * (10 ** decimals))
+            
+            transaction = contract.functions.transfer(to_address, amount_raw).build_transaction({
+                'from': from_address,
+                'gas': 100000,
+                'gasPrice': gas_price,
+                'nonce': web3.eth.get_transaction_count(from_address)
+            })
+        else:
+            # Native token transfer
+            amount_wei = web3.to_wei(amount, 'ether')
+            transaction = {
+                'from': from_address,
+                'to': to_address,
+                'value': amount_wei,
+                'gas': 21000,
+                'gasPrice': gas_price
+            }
+        
+        return web3.eth.estimate_gas(transaction)
+    
     def get_transaction_status(self, tx_hash: str, chain: str) -> Dict:
         """Get transaction status and details"""
         try:
@@ -334,26 +475,64 @@ class TransactionManager:
                     return {"success": False, "error": "Transaction not found"}
                     
             elif chain in self.web3_connections:
-                web3 = self.web3_connections[chain]
+                receipt_key = (chain, tx_hash.lower())
+                with self._cache_lock:
+                    known = self._receipts.get(receipt_key)
+                    current_block = self._block_numbers.get(chain)
+                
+                if known is not None:
+                    if current_block is None:
+                        current_block = self._call_with_fallback(chain, lambda web3: web3.eth.block_number)
+                        with self._cache_lock:
+                            self._block_numbers[chain] = current_block
+                    return {**known, "confirmations": current_block - known["block_number"]}
+                
+                try:
+                    # Receipt and current block in one round trip
+                    receipt_reply, block_reply = self._rpc_batch(chain, [
+                        ("eth_getTransactionReceipt", [tx_hash]),
+                        ("eth_blockNumber", [])
+                    ])
+                    receipt = receipt_reply["result"]
+                    current_block = int(block_reply["result"], 16)
+                except Exception:
+                    # Fall back to separate calls below for endpoints that reject batches
+                    receipt = current_block = None
+                
+                if current_block is not None and not receipt:
+                    return {"success": False, "error": "Transaction not found"}
                 
-                # Get transaction receipt
-                receipt = web3.eth.get_transaction_receipt(tx_hash)
                 if receipt:
-                    # Get current block number
-                    current_block = web3.eth.block_number
-                    confirmations = current_block - receipt.blockNumber
+                    known = {
+                        "success": True,
+                        "tx_hash": tx_hash,
+                        "status": "confirmed" if int(receipt["status"], 16) == 1 else "failed",
+                        "block_number": int(receipt["blockNumber"], 16),
+                        "gas_used": int(receipt["gasUsed"], 16),
+                        "effective_gas_price": int(receipt["effectiveGasPrice"], 16)
+                    }
+                else:
+                    # Get transaction receipt
+                    receipt = self._call_with_fallback(chain, lambda web3: web3.eth.get_transaction_receipt(tx_hash))
+                    if not receipt:
+                        return {"success": False, "error": "Transaction not found"}
                     
-                    return {
+                    # Get current block number
+                    current_block = self._call_with_fallback(chain, lambda web3: web3.eth.block_number)
+                    known = {
                         "success": True,
                         "tx_hash": tx_hash,
                         "status": "confirmed" if receipt.status == 1 else "failed",
                         "block_number": receipt.blockNumber,
-                        "confirmations": confirmations,
                         "gas_used": receipt.gasUsed,
                         "effective_gas_price": receipt.effectiveGasPrice
                     }
-                else:
-                    return {"success": False, "error": "Transaction not found"}
+                
+                with self._cache_lock:
+                    self._receipts[receipt_key] = known
+                    self._block_numbers[chain] = current_block
+                
+                return {**known, "confirmations": current_block - known["block_number"]}
             else:
                 return {"success": False, "error": f"Unsupported chain: {chain}"}
                 
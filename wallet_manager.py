@@ -1,11 +1,14 @@
 import sqlite3
 import json
 import os
+import logging
 from cryptography.fernet import Fernet
 from web3 import Web3
 import requests
 from typing import Dict, List, Optional
 
+logger = logging.getLogger(__name__)
+
 class WalletManager:
     def __init__(self, db_path: str = "wallets.db"):
         self.db_path = db_path
@@ -27,7 +30,7 @@ class WalletManager:
             try:
                 self.web3_connections[chain] = Web3(Web3.HTTPProvider(endpoint))
             except Exception as e:
-                print(f"Failed to connect to {chain}: {e}")
+                logger.error("Failed to connect to %s: %s", chain, e)
     
     def _get_or_create_key(self) -> bytes:
         """Get existing encryption key or create a new one"""